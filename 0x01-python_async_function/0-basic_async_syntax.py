@@ -2,10 +2,14 @@
 '''Module defines coroutines `wait_random`'''
 import asyncio
 import random
+from typing import Optional
 
 
-async def wait_random(max_delay: int = 10) -> float:
-    '''random delay between 0 and max_delay'''
+async def wait_random(max_delay: int = 10,
+                      sleeper: Optional['SharedSleeper'] = None) -> float:
+    '''random delay between 0 and max_delay
+    `sleeper` sleeps through a SharedSleeper (5-shared_sleeper) instead
+    of asyncio.sleep'''
     i = random.uniform(0, max_delay)
-    await asyncio.sleep(i)
+    await (asyncio.sleep(i) if sleeper is None else sleeper.sleep(i))
     return i
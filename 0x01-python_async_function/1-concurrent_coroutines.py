@@ -1,12 +1,45 @@
 #!/usr/bin/env python3
-'''Module defines coroutines `wait_random`'''
+'''Module defines coroutines `wait_n` and `iter_wait_n`'''
 import asyncio
-from typing import List
+from typing import AsyncIterator, List, Optional
 
 wait_random = __import__('0-basic_async_syntax').wait_random
+SharedSleeper = __import__('5-shared_sleeper').SharedSleeper
 
 
-async def wait_n(n: int, max_delay: int) -> List[float]:
-    '''return the list of all the delays (float values)'''
-    res = await asyncio.gather(*(wait_random(max_delay) for _ in range(n)))
-    return sorted(res)
+async def wait_n(n: int, max_delay: int, window: Optional[int] = None,
+                 sleeper: Optional[SharedSleeper] = None) -> List[float]:
+    '''return the list of all the delays (float values)
+    `window` keeps at most that many delays in flight: each of `window`
+    workers awaits the next delay of a shared generator, so coroutines
+    are created as they are needed instead of all n at once.
+    `sleeper` makes every delay sleep through that SharedSleeper'''
+    if window is None:
+        res = await asyncio.gather(
+            *(wait_random(max_delay, sleeper) for _ in range(n)))
+        return sorted(res)
+    if window < 1:
+        raise ValueError('window must be at least 1')
+    done: List[float] = []
+    delays = (wait_random(max_delay, sleeper) for _ in range(n))
+
+    async def worker() -> None:
+        '''await delays one after the other until none are left'''
+        for delay in delays:
+            done.append(await delay)
+
+    await asyncio.gather(*(worker() for _ in range(min(window, n))))
+    return sorted(done)
+
+
+async def iter_wait_n(n: int, max_delay: int) -> AsyncIterator[float]:
+    '''yield the delays (float values) as they complete, shortest first,
+    without waiting for the longest one; delays still pending when the
+    iteration stops early are cancelled'''
+    tasks = [asyncio.ensure_future(wait_random(max_delay)) for _ in range(n)]
+    try:
+        for delay in asyncio.as_completed(tasks):
+            yield await delay
+    finally:
+        for task in tasks:
+            task.cancel()
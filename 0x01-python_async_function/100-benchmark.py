@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+'''Measure throughput and peak memory of wait_n as n grows,
+all at once and with a concurrency window.
+Usage: ./100-benchmark.py [max_n] [window] [max_delay]
+'''
+import asyncio
+import sys
+import time
+import tracemalloc
+from typing import Optional, Tuple
+
+wait_n = __import__('1-concurrent_coroutines').wait_n
+
+
+def measure(n: int, max_delay: float,
+            window: Optional[int]) -> Tuple[float, int]:
+    '''seconds of one wait_n run, and peak traced bytes of another'''
+    start = time.perf_counter()
+    asyncio.run(wait_n(n, max_delay, window))
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        asyncio.run(wait_n(n, max_delay, window))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    max_delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.001
+    n = 1000
+    while n <= max_n:
+        for label, size in (('all at once', None),
+                            ('window={}'.format(window), window)):
+            elapsed, peak = measure(n, max_delay, size)
+            print('{:>8} delays  {:<12} {:8.3f} s  {:>10,.0f} delays/s'
+                  '  peak {:8.1f} MB'.format(n, label, elapsed, n / elapsed,
+                                             peak / 2 ** 20))
+        n *= 10
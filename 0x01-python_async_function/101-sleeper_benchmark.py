@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+'''Compare asyncio.sleep with a SharedSleeper at high fan-out:
+n concurrent wait_random delays of up to max_delay seconds each.
+Usage: ./101-sleeper_benchmark.py [max_n] [max_delay]
+'''
+import asyncio
+import sys
+import time
+from typing import Optional
+
+wait_n = __import__('1-concurrent_coroutines').wait_n
+SharedSleeper = __import__('5-shared_sleeper').SharedSleeper
+
+
+def measure(n: int, max_delay: float, shared: bool) -> float:
+    '''seconds of one wait_n(n, max_delay) run'''
+    async def run() -> None:
+        '''sleep through a fresh SharedSleeper, or asyncio.sleep'''
+        sleeper: Optional[SharedSleeper] = SharedSleeper() if shared \
+            else None
+        await wait_n(n, max_delay, sleeper=sleeper)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    max_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    n = 10 ** 4
+    while n <= max_n:
+        for label, shared in (('asyncio.sleep', False),
+                              ('SharedSleeper', True)):
+            elapsed = measure(n, max_delay, shared)
+            print('{:>8} delays  {:<14} {:8.3f} s  overhead {:8.3f} s'
+                  '  {:>10,.0f} delays/s'.format(
+                      n, label, elapsed, elapsed - max_delay, n / elapsed))
+        n *= 10
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+'''Compare the scheduling overhead of every event loop backend on
+wait_n, task_wait_n and a fan-out of 0x02's async_comprehension.
+Overhead is the wall time beyond the longest sleep; on the virtual
+backend, where sleeps take no real time, it is the whole wall time.
+Usage: ./102-loop_benchmark.py [n] [max_delay] [comprehensions]
+'''
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', '0x02-python_async_comprehension'))
+
+wait_n = __import__('1-concurrent_coroutines').wait_n
+task_wait_n = __import__('4-tasks').task_wait_n
+backends = __import__('7-loop_backends')
+async_comprehension = __import__('1-async_comprehension').async_comprehension
+
+
+def run(backend: str, workload: Callable[[], Awaitable[float]]
+        ) -> Tuple[float, float]:
+    '''wall seconds of `workload` on `backend`, and the seconds of its
+    longest sleep'''
+    start = time.perf_counter()
+    longest = backends.run(workload(), backends.loop_factory(backend))
+    return time.perf_counter() - start, longest
+
+
+def workloads(n: int, max_delay: float, comprehensions: int
+              ) -> List[Tuple[str, int, Callable[[], Awaitable[float]]]]:
+    '''(name, fan-out, coroutine function returning its longest sleep)'''
+    async def delays() -> float:
+        '''wait_n fan-out'''
+        return max(await wait_n(n, max_delay))
+
+    async def tasks() -> float:
+        '''task_wait_n fan-out'''
+        return max(await task_wait_n(n, max_delay))
+
+    async def comprehension() -> float:
+        '''async_comprehension fan-out, ten 1 s sleeps each'''
+        await asyncio.gather(
+            *(async_comprehension() for _ in range(comprehensions)))
+        return 10.0
+
+    return [('wait_n', n, delays), ('task_wait_n', n, tasks),
+            ('async_comprehension', comprehensions, comprehension)]
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 4
+    max_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    comprehensions = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    for name, fan_out, workload in workloads(n, max_delay, comprehensions):
+        for backend in backends.available():
+            wall, longest = run(backend, workload)
+            overhead = wall if backend == 'virtual' else wall - longest
+            print('{:<20} {:>7} x  {:<8} wall {:8.3f} s  overhead {:8.1f}'
+                  ' ms  {:7.2f} us each'.format(
+                      name, fan_out, backend, wall, overhead * 1000,
+                      overhead * 1e6 / fan_out))
@@ -1,13 +1,28 @@
 #!/usr/bin/env python3
 '''Module defines coroutines `measure_time`'''
 import asyncio
-import time
+from typing import Callable, Optional, Union
 
 wait_n = __import__('1-concurrent_coroutines').wait_n
+backends = __import__('7-loop_backends')
 
 
-def measure_time(n: int, max_delay: int) -> float:
-    '''measure time of execution'''
-    start = time.perf_counter()
-    asyncio.run(wait_n(n, max_delay))
-    return time.perf_counter() - start
+def measure_time(n: int, max_delay: int,
+                 loop_factory: Union[
+                     None, str, Callable[[], asyncio.AbstractEventLoop]
+                 ] = None) -> float:
+    '''measure time of execution, on the event loop's clock
+    `loop_factory` makes the loop, or names a backend of
+    7-loop_backends: "asyncio" (the default), "uvloop" or "virtual"
+    to run in virtual time'''
+    if isinstance(loop_factory, str):
+        loop_factory = backends.loop_factory(loop_factory)
+
+    async def timed() -> float:
+        '''wait_n's duration'''
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await wait_n(n, max_delay)
+        return loop.time() - start
+
+    return backends.run(timed(), loop_factory)
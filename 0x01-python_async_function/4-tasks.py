@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 '''Module defines coroutines `task_wait_n`'''
-from typing import List
+from typing import List, Optional
 wait_n = __import__('1-concurrent_coroutines').wait_n
+SharedSleeper = __import__('5-shared_sleeper').SharedSleeper
 
 
-async def task_wait_n(n: int, max_delay: int) -> List[float]:
-    '''return the list of all the delays (float values)'''
-    return await (wait_n(n, max_delay))
+async def task_wait_n(n: int, max_delay: int, window: Optional[int] = None,
+                      sleeper: Optional[SharedSleeper] = None
+                      ) -> List[float]:
+    '''return the list of all the delays (float values)
+    `window` and `sleeper` are wait_n's'''
+    return await (wait_n(n, max_delay, window, sleeper))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+'''Module defines `SharedSleeper`, one loop timer for many sleeps'''
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, List, Optional, Tuple
+
+_RESOLUTION = time.get_clock_info('monotonic').resolution
+
+
+class SharedSleeper:
+    '''drop-in for asyncio.sleep behind a single event-loop timer
+    Wake-ups are kept in a min-heap of deadlines. Only the earliest one
+    has a loop timer: when it fires, every sleep that is due wakes up
+    and the timer is armed again for the next deadline. A sleeper
+    belongs to the loop it first sleeps on.
+    '''
+
+    def __init__(self) -> None:
+        '''empty sleeper, not yet bound to a loop'''
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heap: List[Tuple[float, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        '''number of pending wake-ups, cancelled sleeps included'''
+        return len(self._heap)
+
+    async def sleep(self, delay: float, result: Any = None) -> Any:
+        '''like asyncio.sleep(delay, result)'''
+        if delay <= 0:
+            return await asyncio.sleep(0, result)
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError('SharedSleeper used on another event loop')
+        when = loop.time() + delay
+        future = loop.create_future()
+        heapq.heappush(self._heap, (when, next(self._order), future))
+        if self._timer is None or when < self._timer.when():
+            self._arm(when)
+        await future
+        return result
+
+    def _arm(self, when: float) -> None:
+        '''(re)place the loop timer at `when`'''
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_at(when, self._wake)
+
+    def _wake(self) -> None:
+        '''wake every sleep that is due, then arm for the next one'''
+        self._timer = None
+        heap = self._heap
+        due = self._loop.time() + _RESOLUTION
+        while heap and heap[0][0] <= due:
+            future = heapq.heappop(heap)[2]
+            if not future.done():
+                future.set_result(None)
+        if heap:
+            self._arm(heap[0][0])
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+'''Module defines `VirtualEventLoop`, an event loop on a virtual clock'''
+import asyncio
+import random
+import selectors
+from typing import Any, List, Optional, Tuple
+
+
+class _VirtualSelector:
+    '''selector skipping the clock ahead instead of waiting for a timer'''
+
+    def __init__(self, selector: selectors.BaseSelector,
+                 loop: 'VirtualEventLoop') -> None:
+        '''wrap `selector`, advancing the clock of `loop`'''
+        self._selector = selector
+        self._loop = loop
+
+    def __getattr__(self, name: str) -> Any:
+        '''everything but select is the wrapped selector's'''
+        return getattr(self._selector, name)
+
+    def select(self, timeout: Optional[float] = None
+               ) -> List[Tuple[selectors.SelectorKey, int]]:
+        '''ready I/O at once, else move the clock `timeout` ahead'''
+        if timeout is None:
+            return self._selector.select()
+        events = self._selector.select(0)
+        if not events and timeout > 0:
+            self._loop.advance(timeout)
+        return events
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    '''event loop whose clock only moves when nothing is ready to run
+    Instead of waiting for its next timer, the loop jumps its clock to
+    it: sleeps return at once, in the same order, while loop.time()
+    reports the seconds they took. Ready I/O is still served, and the
+    loop only really blocks when no timer is scheduled (e.g. waiting
+    on a thread). `seed` seeds the random module, which wait_random
+    draws its delays from, so runs repeat exactly: the loop keeps its
+    own random state, in place only while it runs, and the process's
+    is restored when it stops.
+    Example:
+        loop = VirtualEventLoop()
+        loop.run_until_complete(wait_n(10 ** 4, 10))
+        loop.close()
+    '''
+
+    def __init__(self, seed: Optional[int] = None,
+                 start: float = 0.0) -> None:
+        '''virtual clock starting at `start` seconds'''
+        self._now = start
+        self._random_state = None if seed is None \
+            else random.Random(seed).getstate()
+        super().__init__(_VirtualSelector(selectors.DefaultSelector(), self))
+
+    def run_forever(self) -> None:
+        '''run with the seeded random state in place of the process's'''
+        if self._random_state is None:
+            return super().run_forever()
+        outer = random.getstate()
+        random.setstate(self._random_state)
+        try:
+            super().run_forever()
+        finally:
+            self._random_state = random.getstate()
+            random.setstate(outer)
+
+    def time(self) -> float:
+        '''the virtual clock'''
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        '''move the virtual clock `seconds` ahead'''
+        self._now += seconds
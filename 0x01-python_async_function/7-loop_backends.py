@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+'''Module defines the event loop backends coroutines can be run on'''
+import asyncio
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+VirtualEventLoop = __import__('6-virtual_loop').VirtualEventLoop
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+LoopFactory = Optional[Callable[[], asyncio.AbstractEventLoop]]
+
+BACKENDS: Dict[str, LoopFactory] = {
+    'asyncio': None,
+    'virtual': VirtualEventLoop,
+}
+if uvloop is not None:
+    BACKENDS['uvloop'] = uvloop.new_event_loop
+
+
+def available() -> List[str]:
+    '''names of the backends usable here: asyncio (its default loop),
+    uvloop when it is installed, and virtual (VirtualEventLoop)'''
+    return sorted(BACKENDS)
+
+
+def loop_factory(backend: str) -> LoopFactory:
+    '''loop factory of `backend` for run, None for asyncio'''
+    if backend == 'uvloop' and uvloop is None:
+        raise ImportError('uvloop is not installed')
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            'unknown event loop backend: {!r}'.format(backend)) from None
+
+
+def run(main: Coroutine[Any, Any, Any], factory: LoopFactory = None) -> Any:
+    '''run `main` to completion and return its result: asyncio.run when
+    `factory` is None, else on a new loop made by `factory`, which is
+    closed afterwards (asyncio.Runner takes loop_factory from 3.11 only)'''
+    if factory is None:
+        return asyncio.run(main)
+    loop = factory()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(
+                asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+'''test_concurrent_coroutines.py
+   This module contains the test cases for the 1-concurrent_coroutines
+   module
+'''
+import asyncio
+import unittest
+from parameterized import parameterized
+from typing import List
+from unittest.mock import patch
+
+concurrent_coroutines = __import__('1-concurrent_coroutines')
+iter_wait_n = concurrent_coroutines.iter_wait_n
+wait_n = concurrent_coroutines.wait_n
+task_wait_n = __import__('4-tasks').task_wait_n
+
+
+class TestWaitN(unittest.IsolatedAsyncioTestCase):
+    '''Test the wait_n coroutine
+        Methods:
+            test_window - test that at most `window` delays are in
+            flight, and all of them without one
+            test_bad_window - test that a window below 1 is refused
+    '''
+    def setUp(self) -> None:
+        '''wait_random counting the delays in flight'''
+        self.in_flight = self.most = 0
+
+        async def wait_random(max_delay: int, sleeper: object) -> float:
+            '''a 1 ms delay, counted while it runs'''
+            self.in_flight += 1
+            self.most = max(self.most, self.in_flight)
+            await asyncio.sleep(0.001)
+            self.in_flight -= 1
+            return 0.001
+
+        patcher = patch.object(concurrent_coroutines, 'wait_random',
+                               wait_random)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @parameterized.expand([
+        (10, None, 10),
+        (10, 3, 3),
+        (10, 1, 1),
+        (2, 5, 2),
+    ])
+    async def test_window(self, n: int, window: int, most: int) -> None:
+        '''test_window method'''
+        self.assertEqual(await wait_n(n, 1, window), [0.001] * n)
+        self.assertEqual(self.most, most)
+        self.most = 0
+        self.assertEqual(await task_wait_n(n, 1, window), [0.001] * n)
+        self.assertEqual(self.most, most)
+
+    async def test_bad_window(self) -> None:
+        '''test_bad_window method'''
+        with self.assertRaises(ValueError):
+            await wait_n(3, 1, 0)
+
+
+class TestIterWaitN(unittest.IsolatedAsyncioTestCase):
+    '''Test the iter_wait_n coroutine
+        Methods:
+            test_iter_wait_n - test that delays are yielded shortest
+            first as they complete
+            test_early_stop - test that the delays still pending are
+            cancelled when the iteration stops early
+    '''
+    def setUp(self) -> None:
+        '''wait_random sleeping through self.delays in turn'''
+        self.delays = iter([0.03, 0.01, 0.05, 0.02, 0.04])
+        self.cancelled: List[float] = []
+
+        async def wait_random(max_delay: int) -> float:
+            '''the next delay, recorded when cancelled'''
+            delay = next(self.delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(delay)
+                raise
+            return delay
+
+        patcher = patch.object(concurrent_coroutines, 'wait_random',
+                               wait_random)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_iter_wait_n(self) -> None:
+        '''test_iter_wait_n method'''
+        self.assertEqual([delay async for delay in iter_wait_n(5, 1)],
+                         [0.01, 0.02, 0.03, 0.04, 0.05])
+        self.assertEqual(self.cancelled, [])
+
+    async def test_early_stop(self) -> None:
+        '''test_early_stop method'''
+        self.delays = iter([3, 0.01, 5, 0.02, 4])
+        delays = iter_wait_n(5, 1)
+        self.assertEqual(await delays.__anext__(), 0.01)
+        self.assertEqual(await delays.__anext__(), 0.02)
+        await delays.aclose()
+        await asyncio.sleep(0)
+        self.assertEqual(sorted(self.cancelled), [3, 4, 5])
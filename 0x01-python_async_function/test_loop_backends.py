@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+'''test_loop_backends.py
+   This module contains the test cases for the 7-loop_backends module
+'''
+import asyncio
+import unittest
+from parameterized import parameterized
+from unittest.mock import patch
+
+backends = __import__('7-loop_backends')
+measure_time = __import__('2-measure_runtime').measure_time
+
+
+class TestLoopBackends(unittest.TestCase):
+    '''Test the event loop backends
+        Methods:
+            test_measure_time - test that wait_n takes about its longest
+            delay on each backend
+            test_unknown - test that an unknown backend is refused
+            test_missing_uvloop - test that uvloop is refused when it is
+            not installed
+            test_run - test that run returns the result, on asyncio's
+            default loop or on one from the factory
+            test_run_cleanup - test that run cancels leftover tasks and
+            closes the factory's loop
+    '''
+    @parameterized.expand([(name,) for name in backends.available()])
+    def test_measure_time(self, backend: str) -> None:
+        '''test_measure_time method'''
+        max_delay = 10 if backend == 'virtual' else 0.05
+        self.assertLessEqual(measure_time(20, max_delay, backend),
+                             max_delay + 0.05)
+
+    def test_unknown(self) -> None:
+        '''test_unknown method'''
+        with self.assertRaises(ValueError):
+            backends.loop_factory('trio')
+
+    def test_missing_uvloop(self) -> None:
+        '''test_missing_uvloop method'''
+        with patch.object(backends, 'uvloop', None):
+            with self.assertRaises(ImportError):
+                backends.loop_factory('uvloop')
+
+    @parameterized.expand([(name,) for name in backends.available()])
+    def test_run(self, backend: str) -> None:
+        '''test_run method'''
+        async def loop_type() -> type:
+            '''type of the running loop, after a sleep'''
+            await asyncio.sleep(0.001)
+            return type(asyncio.get_running_loop())
+
+        factory = backends.loop_factory(backend)
+        probe = asyncio.new_event_loop() if factory is None else factory()
+        probe.close()
+        self.assertIs(backends.run(loop_type(), factory), type(probe))
+
+    def test_run_cleanup(self) -> None:
+        '''test_run_cleanup method'''
+        loops = []
+        leftover = []
+
+        def factory() -> asyncio.AbstractEventLoop:
+            '''a new default loop, recorded'''
+            loops.append(asyncio.new_event_loop())
+            return loops[-1]
+
+        async def main() -> int:
+            '''start a task that outlives main'''
+            leftover.append(asyncio.ensure_future(asyncio.sleep(60)))
+            return 42
+
+        self.assertEqual(backends.run(main(), factory), 42)
+        self.assertTrue(leftover[0].cancelled())
+        self.assertTrue(loops[0].is_closed())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+'''test_shared_sleeper.py
+   This module contains the test cases for the 5-shared_sleeper module
+'''
+import asyncio
+import unittest
+from typing import List
+
+SharedSleeper = __import__('5-shared_sleeper').SharedSleeper
+
+
+class TestSharedSleeper(unittest.IsolatedAsyncioTestCase):
+    '''Test the SharedSleeper class
+        Methods:
+            test_order - test that sleeps wake up by deadline, each
+            with its result
+            test_cancelled - test that cancelled sleeps are skipped
+            test_rearm - test that a shorter sleep moves the timer
+            earlier
+    '''
+    def setUp(self) -> None:
+        '''a fresh sleeper'''
+        self.sleeper = SharedSleeper()
+        self.woken: List[float] = []
+
+    async def sleep(self, delay: float) -> float:
+        '''sleep `delay`, recording the wake-up'''
+        result = await self.sleeper.sleep(delay, delay)
+        self.woken.append(delay)
+        return result
+
+    async def test_order(self) -> None:
+        '''test_order method'''
+        delays = [0.03, 0.01, 0.02, 0.01, 0]
+        self.assertEqual(
+            await asyncio.gather(*(self.sleep(delay) for delay in delays)),
+            delays)
+        self.assertEqual(self.woken, sorted(delays))
+        self.assertEqual(len(self.sleeper), 0)
+        self.assertIsNone(self.sleeper._timer)
+
+    async def test_cancelled(self) -> None:
+        '''test_cancelled method'''
+        cancelled = asyncio.ensure_future(self.sleep(0.01))
+        kept = asyncio.ensure_future(self.sleep(0.02))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        self.assertEqual(await kept, 0.02)
+        self.assertTrue(cancelled.cancelled())
+        self.assertEqual(self.woken, [0.02])
+        self.assertEqual(len(self.sleeper), 0)
+
+    async def test_rearm(self) -> None:
+        '''test_rearm method'''
+        loop = asyncio.get_running_loop()
+        long = asyncio.ensure_future(self.sleep(1))
+        await asyncio.sleep(0)
+        self.assertAlmostEqual(self.sleeper._timer.when() - loop.time(),
+                               1, delta=0.1)
+        start = loop.time()
+        await self.sleep(0.01)
+        self.assertLess(loop.time() - start, 0.5)
+        self.assertFalse(long.done())
+        self.assertEqual(len(self.sleeper), 1)
+        self.assertAlmostEqual(self.sleeper._timer.when() - start,
+                               1, delta=0.1)
+        long.cancel()
+
+
+class TestSharedSleeperLoop(unittest.TestCase):
+    '''Test the event loop a SharedSleeper is bound to
+        Methods:
+            test_other_loop - test that a sleeper refuses to sleep on
+            another loop than its first
+    '''
+    def test_other_loop(self) -> None:
+        '''test_other_loop method'''
+        sleeper = SharedSleeper()
+        self.assertEqual(asyncio.run(sleeper.sleep(0.001, 'first')),
+                         'first')
+        with self.assertRaisesRegex(RuntimeError, 'another event loop'):
+            asyncio.run(sleeper.sleep(0.001))
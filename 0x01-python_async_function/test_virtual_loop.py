@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+'''test_virtual_loop.py
+   This module contains the test cases for the 6-virtual_loop module
+'''
+import asyncio
+import random
+import time
+import unittest
+from typing import Any, Coroutine, List, Optional, Tuple
+
+VirtualEventLoop = __import__('6-virtual_loop').VirtualEventLoop
+backends = __import__('7-loop_backends')
+wait_random = __import__('0-basic_async_syntax').wait_random
+wait_n = __import__('1-concurrent_coroutines').wait_n
+
+
+class TestVirtualEventLoop(unittest.TestCase):
+    '''Test the VirtualEventLoop class
+        Methods:
+            test_seed - test that a seeded loop repeats the same delays
+            test_seed_scope - test that the seed applies while the loop
+            runs only
+            test_time - test that loop.time() moves by each delay while
+            no real time passes
+            test_start - test that the clock starts at `start`
+    '''
+    def run_virtual(self, main: Coroutine, seed: Optional[int] = None,
+                    start: float = 0.0) -> Any:
+        '''run `main` on a new VirtualEventLoop'''
+        return backends.run(main, lambda: VirtualEventLoop(seed, start))
+
+    def test_seed(self) -> None:
+        '''test_seed method'''
+        first = self.run_virtual(wait_n(50, 10), seed=7)
+        self.assertEqual(self.run_virtual(wait_n(50, 10), seed=7), first)
+        self.assertNotEqual(self.run_virtual(wait_n(50, 10), seed=8),
+                            first)
+
+    def test_seed_scope(self) -> None:
+        '''test_seed_scope method'''
+        state = random.getstate()
+        loop = VirtualEventLoop(seed=7)
+        self.assertEqual(random.getstate(), state)
+        first = loop.run_until_complete(wait_n(5, 10))
+        self.assertEqual(random.getstate(), state)
+        second = loop.run_until_complete(wait_n(5, 10))
+        loop.close()
+        self.assertEqual(random.getstate(), state)
+        self.assertNotEqual(second, first)
+        self.assertEqual(self.run_virtual(wait_n(10, 10), seed=7),
+                         sorted(first + second))
+
+    def test_time(self) -> None:
+        '''test_time method'''
+        async def timed() -> List[Tuple[float, float]]:
+            '''each delay and the loop time it took'''
+            loop = asyncio.get_running_loop()
+
+            async def one() -> Tuple[float, float]:
+                '''one delay and the loop time it took'''
+                start = loop.time()
+                delay = await wait_random(100)
+                return delay, loop.time() - start
+
+            return await asyncio.gather(*(one() for _ in range(50)))
+
+        start = time.perf_counter()
+        for delay, took in self.run_virtual(timed(), seed=1):
+            self.assertAlmostEqual(took, delay, delta=1e-6)
+        self.assertLess(time.perf_counter() - start, 5)
+
+    def test_start(self) -> None:
+        '''test_start method'''
+        async def now() -> float:
+            '''the loop time after a 2 s sleep'''
+            await asyncio.sleep(2)
+            return asyncio.get_running_loop().time()
+
+        self.assertEqual(self.run_virtual(now(), start=1000.0), 1002.0)
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 '''Module defines `measure_runtime`'''
 import asyncio
-import time
 
 async_comprehension = __import__('1-async_comprehension').async_comprehension
 
 
 async def measure_runtime() -> float:
-    '''execute async_comprehension four times in parallel'''
-    start = time.perf_counter()
+    '''execute async_comprehension four times in parallel
+    timed on the running loop's clock, virtual under a virtual loop'''
+    loop = asyncio.get_running_loop()
+    start = loop.time()
     await asyncio.gather(*(async_comprehension() for _ in range(4)))
-    return time.perf_counter() - start
+    return loop.time() - start
@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+"""Benchmarks of the github org client against a local stand-in server.
+Usage: ./benchmark.py <name> [--orgs N]
+       ./benchmark.py suite [--sizes N,N] [--per-page N] [--json FILE|-]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+import client
+import utils
+from client import GithubOrgClient, Repo, RepoTable
+from fixtures import TEST_PAYLOAD
+from stub_server import StubGithubServer
+
+
+_MIT = {
+    "key": "mit",
+    "name": "MIT License",
+    "spdx_id": "MIT",
+    "url": "https://api.github.com/licenses/mit",
+    "node_id": "MDc6TGljZW5zZTEz",
+}
+
+
+def _timestamp(seconds: float) -> str:
+    """GitHub's format of a POSIX timestamp"""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+def scaled_repos(count: int, seed: int = 0) -> List[Dict]:
+    """`count` repos shaped like the fixture's, drawn from `seed`.
+    Each one copies a fixture repo with a unique id and name (also in its
+    URLs), and draws its license, counters, flags and dates.
+    """
+    rnd = random.Random(seed)
+    fixture = TEST_PAYLOAD[0][1]
+    licenses = [repo["license"] for repo in fixture] + [_MIT, _MIT]
+    start, end = 1230768000, 1704067200
+    repos = []
+    for i in range(count):
+        template = fixture[i % len(fixture)]
+        name = "{}-{}".format(template["name"], i)
+        full_name = "{}/{}".format(template["owner"]["login"], name)
+        old = template["full_name"]
+        repo = {key: value.replace(old, full_name)
+                if type(value) is str else value
+                for key, value in template.items()}
+        created = rnd.uniform(start, end)
+        updated = rnd.uniform(created, end)
+        stars = int(rnd.paretovariate(1.2)) - 1
+        forks = int(stars * rnd.random() / 4)
+        issues = rnd.randrange(stars // 10 + 2)
+        repo.update(
+            id=i, name=name, full_name=full_name,
+            license=rnd.choice(licenses),
+            fork=rnd.random() < 0.1, archived=rnd.random() < 0.05,
+            size=int(rnd.lognormvariate(8, 2)),
+            stargazers_count=stars, watchers_count=stars, watchers=stars,
+            forks_count=forks, forks=forks,
+            open_issues_count=issues, open_issues=issues,
+            created_at=_timestamp(created), updated_at=_timestamp(updated),
+            pushed_at=_timestamp(rnd.uniform(created, updated)),
+        )
+        repos.append(repo)
+    return repos
+
+
+def _fetch_orgs(server: StubGithubServer, orgs: int) -> float:
+    """Time `public_repos` for `orgs` fresh clients, in seconds"""
+    start = time.perf_counter()
+    with patch.object(GithubOrgClient, "ORG_URL", server.org_url):
+        for i in range(orgs):
+            GithubOrgClient("org{}".format(i)).public_repos()
+    return time.perf_counter() - start
+
+
+def bench_session(args: argparse.Namespace) -> None:
+    """One-off requests vs the shared keep-alive session"""
+    orgs = args.orgs
+    for label, pooled in (("requests.get", False), ("session", True)):
+        if pooled:
+            utils.configure_session()
+        try:
+            with StubGithubServer() as server:
+                elapsed = _fetch_orgs(server, orgs)
+                print("{:<14} {:>4} orgs  {:8.2f} ms/org  {:>5} connections"
+                      .format(label, orgs, elapsed * 1000 / orgs,
+                              server.connections))
+        finally:
+            utils.close_session()
+
+
+def bench_many(args: argparse.Namespace) -> None:
+    """Sequential public_repos vs public_repos_many, 5 ms per answer"""
+    orgs = args.orgs
+    utils.configure_session(pool_maxsize=16)
+    try:
+        with StubGithubServer(delay=0.005) as server, \
+                patch.object(GithubOrgClient, "ORG_URL", server.org_url):
+            names = ["org{}".format(i) for i in range(orgs)]
+            start = time.perf_counter()
+            for name in names:
+                GithubOrgClient(name).public_repos()
+            print("{:<22} {:>4} orgs  {:8.2f} s".format(
+                "sequential", orgs, time.perf_counter() - start))
+            for workers in (4, 16):
+                start = time.perf_counter()
+                GithubOrgClient.public_repos_many(
+                    names, max_concurrency=workers)
+                print("{:<22} {:>4} orgs  {:8.2f} s".format(
+                    "many(concurrency={})".format(workers), orgs,
+                    time.perf_counter() - start))
+    finally:
+        utils.close_session()
+
+
+def bench_license(args: argparse.Namespace) -> None:
+    """Scanning public_repos(license) vs the license index"""
+    licenses = ["apache-2.0", "bsl-1.0", "bsd-3-clause", "other", "mit"]
+    for count in (1000, 10000, 100000):
+        repos = scaled_repos(count)
+
+        def scan() -> None:
+            """The per-query scan public_repos used to do"""
+            for key in licenses:
+                [repo["name"] for repo in repos
+                 if GithubOrgClient.has_license(repo, key)]
+
+        def indexed() -> None:
+            """Build the index once then answer every query from it"""
+            test_client = GithubOrgClient("org")
+            test_client._repos_payload = repos
+            for key in licenses:
+                test_client.public_repos(key)
+
+        print("{:>7} repos, {} licenses  scan {:8.2f} ms  index {:8.2f} ms"
+              .format(count, len(licenses),
+                      min(timeit.repeat(scan, number=1, repeat=3)) * 1000,
+                      min(timeit.repeat(indexed, number=1, repeat=3)) * 1000))
+
+
+def bench_paths(args: argparse.Namespace) -> None:
+    """access_nested_map vs compile_path vs access_nested_maps"""
+    repos = scaled_repos(100000)
+    path = ("license", "key")
+    getter = utils.compile_path(path)
+
+    def plain() -> None:
+        """access_nested_map on every repo"""
+        for repo in repos:
+            try:
+                utils.access_nested_map(repo, path)
+            except KeyError:
+                pass
+
+    def compiled() -> None:
+        """The compiled getter on every repo"""
+        for repo in repos:
+            try:
+                getter(repo)
+            except KeyError:
+                pass
+
+    def batch() -> None:
+        """One access_nested_maps call"""
+        utils.access_nested_maps(repos, path, None)
+
+    for label, fn in (("access_nested_map", plain),
+                      ("compile_path", compiled),
+                      ("access_nested_maps", batch)):
+        best = min(timeit.repeat(fn, number=1, repeat=5))
+        print("{:<20} {:8.1f} ns/repo".format(label, best * 1e9 / len(repos)))
+
+
+def bench_decode(args: argparse.Namespace) -> None:
+    """Whole-body get_json vs streamed get_json(fields=REPO_FIELDS)"""
+    for count in (1000, 10000, 20000):
+        with StubGithubServer(repos=scaled_repos(count)) as server:
+            url = server.base_url + "/orgs/org/repos"
+            for label, fields in (("response.json()", None),
+                                  ("fields", GithubOrgClient.REPO_FIELDS)):
+                elapsed = min(timeit.repeat(
+                    lambda: utils.get_json(url, fields=fields),
+                    number=1, repeat=3))
+                tracemalloc.start()
+                body = utils.get_json(url, fields=fields)
+                held, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                del body
+                print("{:>6} repos  {:<16} {:8.1f} ms  peak {:7.1f} MB"
+                      "  kept {:7.1f} MB".format(
+                          count, label, elapsed * 1000, peak / 2 ** 20,
+                          held / 2 ** 20))
+
+
+def bench_compression(args: argparse.Namespace) -> None:
+    """Bytes on the wire and decode time per encoding and JSON decoder"""
+    decoders = [None, "json"] + ([] if utils.orjson is None else ["orjson"])
+    try:
+        for count in (1000, 10000, 20000):
+            with StubGithubServer(repos=scaled_repos(count),
+                                  compress=True) as server:
+                url = server.base_url + "/orgs/org/repos"
+                for encoding in ("identity", "gzip"):
+                    session = utils.configure_session(
+                        accept_encoding=encoding)
+                    sent = server.bytes_sent
+                    response = session.get(url)
+                    wire = server.bytes_sent - sent
+                    for decoder in decoders:
+                        utils.set_json_decoder(decoder)
+                        fetch = min(timeit.repeat(
+                            lambda: utils.get_json(url), number=1, repeat=3))
+                        decode = min(timeit.repeat(
+                            lambda: utils._decode(url, response, None),
+                            number=1, repeat=3))
+                        print("{:>6} repos  {:<8} {:9.0f} KB on the wire"
+                              "  {:<15} decode {:7.1f} ms  get_json {:7.1f}"
+                              " ms".format(count, encoding, wire / 1024,
+                                           decoder or "response.json()",
+                                           decode * 1000, fetch * 1000))
+    finally:
+        utils.set_json_decoder(None)
+        utils.close_session()
+
+
+def bench_sync(args: argparse.Namespace) -> None:
+    """Full vs incremental refresh of 10000 repos as churn grows"""
+    count = 10000
+    rnd = random.Random(0)
+    utils.configure_session()
+    try:
+        with StubGithubServer(repos=scaled_repos(count)) as server, \
+                patch.object(GithubOrgClient, "ORG_URL", server.org_url):
+            test_client = GithubOrgClient("org", incremental=True)
+            test_client.repos_payload
+            stamp = 1893456000
+            for churn in (0, 10, 100, 1000):
+                repos = list(server.repos)
+                for i in rnd.sample(range(count), churn):
+                    stamp += 1
+                    repos[i] = dict(repos[i], stargazers_count=1,
+                                    updated_at=_timestamp(stamp))
+                server.repos = repos
+                server.ordered("updated", "desc")
+                for label, full in (("incremental", False), ("full", True)):
+                    requests, sent = server.requests, server.bytes_sent
+                    start = time.perf_counter()
+                    test_client.refresh(full=full)
+                    test_client.public_repos("mit")
+                    print("{:>5} changed  {:<12} {:8.1f} ms  {:>3} requests"
+                          "  {:9.0f} KB".format(
+                              churn, label,
+                              (time.perf_counter() - start) * 1000,
+                              server.requests - requests,
+                              (server.bytes_sent - sent) / 1024))
+    finally:
+        utils.close_session()
+
+
+def bench_table(args: argparse.Namespace) -> None:
+    """Dict loops vs RepoTable, with NumPy and with array.array"""
+    repos = scaled_repos(100000)
+
+    def loops() -> None:
+        """The analytics as Python loops over the repo dicts"""
+        Counter(GithubOrgClient.build_license_index(repos))
+        sum(repo["stargazers_count"] for repo in repos
+            if not repo["archived"] and not repo["fork"])
+        [repo["name"] for repo in repos
+         if GithubOrgClient.has_license(repo, "mit")]
+
+    def vectorized(table: RepoTable) -> Callable[[], None]:
+        """The same analytics over `table`'s columns"""
+        def run() -> None:
+            """Count, sum and filter"""
+            table.count_by("license_key")
+            table.where(archived=False, fork=False).sum("stargazers_count")
+            table.where(license_key="mit").names()
+        return run
+
+    print("{:<16} build {:>8} ms  queries {:8.1f} ms".format(
+        "dict loops", "-", min(timeit.repeat(loops, number=1, repeat=5))
+        * 1000))
+    backends = ([] if client.numpy is None else [("numpy", client.numpy)]) \
+        + [("array.array", None)]
+    for label, backend in backends:
+        with patch.object(client, "numpy", backend):
+            build = min(timeit.repeat(lambda: RepoTable.from_repos(repos),
+                                      number=1, repeat=3))
+            table = RepoTable.from_repos(repos)
+            queries = min(timeit.repeat(vectorized(table), number=1,
+                                        repeat=5))
+        print("RepoTable({:<5}) build {:8.1f} ms  queries {:8.1f} ms".format(
+            label[:5], build * 1000, queries * 1000))
+
+
+def bench_repo_memory(args: argparse.Namespace) -> None:
+    """Memory held by full repo dicts, projected dicts and Repo records"""
+    for count in (1000, 10000, 50000):
+        text = json.dumps(scaled_repos(count))
+        for label, build in (
+                ("payload dicts", json.loads),
+                ("projected dicts", lambda text: utils.project(
+                    json.loads(text), GithubOrgClient.REPO_FIELDS)),
+                ("Repo", lambda text: [Repo.from_payload(repo)
+                                       for repo in json.loads(text)])):
+            tracemalloc.start()
+            repos = build(text)
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del repos
+            print("{:>6} repos  {:<16} {:9.1f} MB  {:7.0f} B/repo".format(
+                count, label, held / 2 ** 20, held / count))
+
+
+def bench_rate_limit(args: argparse.Namespace) -> None:
+    """public_repos_many against a 100 requests/s limit, paced or not"""
+    orgs = args.orgs
+    for label, limiter in (("unpaced", None),
+                           ("RateLimiter", utils.RateLimiter(rate=1000))):
+        utils.configure_session(pool_maxsize=16)
+        utils.set_rate_limiter(limiter)
+        try:
+            with StubGithubServer(rate_limit=50, rate_window=0.5) as server, \
+                    patch.object(GithubOrgClient, "ORG_URL", server.org_url):
+                start = time.perf_counter()
+                results = GithubOrgClient.public_repos_many(
+                    ["org{}".format(i) for i in range(orgs)],
+                    max_concurrency=16)
+                elapsed = time.perf_counter() - start
+                failed = sum(isinstance(result, Exception)
+                             for result in results.values())
+                print("{:<12} {:>4} orgs  {:6.2f} s  {:6.1f} req/s"
+                      "  {:>4} throttled  {:>4} orgs failed".format(
+                          label, orgs, elapsed, server.requests / elapsed,
+                          server.throttled, failed))
+        finally:
+            utils.set_rate_limiter(None)
+            utils.close_session()
+
+
+def _percentile(samples: List[float], quantile: float) -> float:
+    """`quantile` of `samples`, nearest rank"""
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+
+def bench_tail(args: argparse.Namespace) -> None:
+    """get_json p50/p99 when 3% of answers take 250 ms instead of 2 ms"""
+    orgs = args.orgs
+    rnd = random.Random(0)
+    policies = (
+        ("single attempt", None),
+        ("timeout+retry", utils.RetryPolicy(timeout=0.02, retries=3,
+                                            backoff=0.001)),
+        ("hedge p90", utils.RetryPolicy(hedge_after=0.02,
+                                        hedge_quantile=0.9)),
+    )
+    for label, policy in policies:
+        utils.configure_session(pool_maxsize=16)
+        utils.set_retry_policy(policy)
+        try:
+            with StubGithubServer(delay=lambda: 0.25 if rnd.random() < 0.03
+                                  else 0.002) as server:
+                url = server.org_url.format(org="google")
+                latencies = []
+                for _ in range(orgs * 2):
+                    start = time.perf_counter()
+                    utils.get_json(url)
+                    latencies.append(time.perf_counter() - start)
+                print("{:<16} {:>4} requests  p50 {:7.1f} ms  p99 {:7.1f} ms"
+                      "  max {:7.1f} ms  sent {:>4}".format(
+                          label, len(latencies),
+                          _percentile(latencies, 0.5) * 1000,
+                          _percentile(latencies, 0.99) * 1000,
+                          max(latencies) * 1000, server.requests))
+        finally:
+            utils.set_retry_policy(None)
+            utils.close_session()
+
+
+def _disk_cache_worker(args: Tuple[str, str, List[str]]) -> None:
+    """One worker process fetching its orgs through the disk cache"""
+    org_url, path, names = args
+    utils.set_disk_cache(utils.DiskCache(path) if path else None)
+    with patch.object(GithubOrgClient, "ORG_URL", org_url):
+        for name in names:
+            GithubOrgClient(name).public_repos()
+
+
+def bench_disk_cache(args: argparse.Namespace) -> None:
+    """Upstream requests of 4 worker processes restarted 3 times"""
+    orgs = args.orgs
+    workers = 4
+    names = ["org{}".format(i) for i in range(orgs)]
+    with tempfile.TemporaryDirectory() as directory:
+        for label, path in (("no disk cache", ""),
+                            ("DiskCache", os.path.join(directory, "c.db"))):
+            with StubGithubServer(delay=0.002) as server:
+                for restart in range(3):
+                    start = time.perf_counter()
+                    with multiprocessing.Pool(workers) as pool:
+                        pool.map(_disk_cache_worker, [
+                            (server.org_url, path, names[i::workers])
+                            for i in range(workers)])
+                    print("{:<14} run {}  {:>5} upstream requests (total)"
+                          "  {:6.2f} s"
+                          .format(label, restart + 1, server.requests,
+                                  time.perf_counter() - start))
+
+
+def bench_metrics(args: argparse.Namespace) -> None:
+    """Cost of the metrics hooks, disabled and enabled"""
+    test_client = GithubOrgClient("org")
+    test_client._org = {"repos_url": "http://localhost/repos"}
+    test_client._repos_payload = scaled_repos(1000)
+    for label in ("disabled", "enabled"):
+        if label == "enabled":
+            utils.enable_metrics()
+        try:
+            memoized = min(timeit.repeat(lambda: test_client.org,
+                                         number=100000, repeat=5))
+            filtered = min(timeit.repeat(test_client.public_repos,
+                                         number=1000, repeat=5))
+        finally:
+            utils.disable_metrics()
+        print("{:<9} memoized read {:6.0f} ns  public_repos(1000 repos)"
+              " {:6.1f} us".format(label, memoized * 1e4, filtered * 1e3))
+
+
+def _stage(make_work: Callable[[], Callable[[Any], Any]], units: List,
+           repeat: int) -> Dict[str, float]:
+    """Time `work(unit)` for every unit, `work` made fresh per round.
+    Returns the best round's total and per-unit p50/p99, in seconds, and
+    the peak memory in bytes of a traced round keeping every result.
+    """
+    rounds = []
+    for _ in range(repeat):
+        work = make_work()
+        samples = []
+        start = time.perf_counter()
+        for unit in units:
+            begin = time.perf_counter()
+            work(unit)
+            samples.append(time.perf_counter() - begin)
+        rounds.append((time.perf_counter() - start, samples))
+    seconds, samples = min(rounds, key=lambda round: round[0])
+    work = make_work()
+    tracemalloc.start()
+    try:
+        results = [work(unit) for unit in units]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del results
+    return {"seconds": seconds, "p50": _percentile(samples, 0.5),
+            "p99": _percentile(samples, 0.99), "peak": peak}
+
+
+def _suite_size(count: int, per_page: int, repeat: int) -> List[Dict]:
+    """Fetch, decode and filter stage results for `count` repos"""
+    licenses = ["apache-2.0", "bsd-3-clause", "mit", "other"]
+    with StubGithubServer(repos=scaled_repos(count),
+                          per_page=per_page or None) as server:
+        session = utils.get_session()
+
+        def page_urls() -> List[str]:
+            """The URL of every page of the repos list, warming the server"""
+            urls = [server.base_url + "/orgs/org/repos"]
+            while True:
+                response = session.get(urls[-1])
+                if "next" not in response.links:
+                    return urls
+                urls.append(response.links["next"]["url"])
+
+        def org_client() -> GithubOrgClient:
+            """A client holding the decoded repos, no index built yet"""
+            test_client = GithubOrgClient("org")
+            test_client._repos_payload = repos
+            return test_client
+
+        def nested_scan(key: str) -> List[str]:
+            """has_license spelled with access_nested_map"""
+            names = []
+            for repo in repos:
+                try:
+                    if utils.access_nested_map(repo, ("license", "key")) \
+                            == key:
+                        names.append(repo["name"])
+                except (KeyError, TypeError):
+                    pass
+            return names
+
+        urls = page_urls()
+        bodies = [session.get(url).content for url in urls]
+        size = sum(map(len, bodies))
+        repos = [repo for body in bodies for repo in json.loads(body)]
+        with patch.object(GithubOrgClient, "ORG_URL", server.org_url):
+            stages = (
+                ("fetch", "session.get", urls, size,
+                 lambda: lambda url: session.get(url).content),
+                ("decode", "json.loads", bodies, size,
+                 lambda: json.loads),
+                ("decode", "Repo records", bodies, size,
+                 lambda: lambda body: [Repo.from_payload(repo)
+                                       for repo in json.loads(body)]),
+                ("filter", "access_nested_map", licenses, 0,
+                 lambda: nested_scan),
+                ("filter", "has_license", licenses, 0,
+                 lambda: lambda key: [
+                     repo["name"] for repo in repos
+                     if GithubOrgClient.has_license(repo, key)]),
+                ("filter", "public_repos", licenses, 0,
+                 lambda: org_client().public_repos),
+                ("end-to-end", "iter_public_repos", licenses[:1], size,
+                 lambda: lambda key: list(
+                     GithubOrgClient("org").iter_public_repos(key))),
+            )
+            results = []
+            for stage, variant, units, nbytes, make_work in stages:
+                timing = _stage(make_work, units, repeat)
+                seconds = timing["seconds"]
+                results.append({
+                    "repos": count,
+                    "stage": stage,
+                    "variant": variant,
+                    "units": len(units),
+                    "seconds": seconds,
+                    "repos_per_s": count * len(units) / seconds
+                    if stage == "filter" else count / seconds,
+                    "mb_per_s": nbytes / 2 ** 20 / seconds if nbytes
+                    else None,
+                    "p50_ms": timing["p50"] * 1000,
+                    "p99_ms": timing["p99"] * 1000,
+                    "peak_mb": timing["peak"] / 2 ** 20,
+                })
+    return results
+
+
+def bench_suite(args: argparse.Namespace) -> None:
+    """Fetch, decode and filter stages over scaled synthetic payloads"""
+    utils.configure_session()
+    try:
+        results = []
+        for count in args.sizes:
+            for result in _suite_size(count, args.per_page, args.repeat):
+                results.append(result)
+                print("{repos:>8} repos  {stage:<10} {variant:<18}"
+                      " {seconds:9.3f} s  {repos_per_s:>11,.0f} repos/s"
+                      "  p50 {p50_ms:8.2f} ms  p99 {p99_ms:8.2f} ms"
+                      "  peak {peak_mb:8.1f} MB".format(**result),
+                      file=sys.stderr if args.json == "-" else sys.stdout)
+    finally:
+        utils.close_session()
+    if args.json:
+        report = json.dumps({
+            "benchmark": "suite",
+            "python": platform.python_version(),
+            "per_page": args.per_page,
+            "repeat": args.repeat,
+            "results": results,
+        }, indent=2)
+        if args.json == "-":
+            print(report)
+        else:
+            with open(args.json, "w") as out:
+                out.write(report + "\n")
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], None]] = {
+    "compression": bench_compression,
+    "decode": bench_decode,
+    "disk-cache": bench_disk_cache,
+    "license": bench_license,
+    "many": bench_many,
+    "metrics": bench_metrics,
+    "paths": bench_paths,
+    "rate-limit": bench_rate_limit,
+    "repo-memory": bench_repo_memory,
+    "session": bench_session,
+    "suite": bench_suite,
+    "sync": bench_sync,
+    "table": bench_table,
+    "tail": bench_tail,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--orgs", type=int, default=200)
+    parser.add_argument("--sizes", default=[1000, 10000],
+                        type=lambda sizes: [int(n) for n in sizes.split(",")],
+                        help="suite: repos per payload, comma separated")
+    parser.add_argument("--per-page", type=int, default=100,
+                        help="suite: repos per page, 0 for one body")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="suite: timed rounds, the best one is kept")
+    parser.add_argument("--json", metavar="FILE",
+                        help="suite: also write the results as JSON, - for"
+                        " stdout")
+    args = parser.parse_args()
+    BENCHMARKS[args.name](args)
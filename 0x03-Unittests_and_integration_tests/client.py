@@ -1,28 +1,271 @@
 #!/usr/bin/env python3
 """A github org client
 """
+import asyncio
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress, count, takewhile
 from typing import (
     List,
+    Any,
+    Callable,
     Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
 )
 
 from utils import (
+    Fields,
+    async_get_json,
+    async_memoize,
     get_json,
-    access_nested_map,
+    iter_json_pages,
+    compile_path,
+    invalidate,
     memoize,
+    timed,
 )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_license_key = compile_path(("license", "key"))
+_payload_versions = count(1)
+
+
+class Repo(NamedTuple):
+    """Compact record of the repo fields GithubOrgClient reads"""
+    name: str
+    license_key: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_payload(cls, repo: Mapping, extra_fields: Sequence[str] = ()
+                     ) -> "Repo":
+        """Build a Repo out of one repo of the repos payload"""
+        try:
+            license_key = _license_key(repo)
+        except KeyError:
+            license_key = None
+        extra = {field: repo[field] for field in extra_fields
+                 if field in repo} if extra_fields else None
+        return cls(repo["name"], license_key, extra)
+
+
+def _repo_name(repo: Union[Dict, Repo]) -> str:
+    """Name of a repo payload or Repo"""
+    return repo.name if type(repo) is Repo else repo["name"]
+
+
+def _repo_license(repo: Union[Dict, Repo]) -> Optional[str]:
+    """License key of a repo payload or Repo, None without one"""
+    if type(repo) is Repo:
+        return repo.license_key
+    try:
+        return _license_key(repo)
+    except KeyError:
+        return None
+
+
+def _repo_version(repo: Union[Dict, Repo]) -> Tuple[Any, str]:
+    """id and updated_at of a repo payload or Repo"""
+    fields = repo.extra if type(repo) is Repo else repo
+    return fields["id"], fields["updated_at"]
+
+
+def _column(values: List, typecode: str) -> Any:
+    """A NumPy array of `values`, or an array.array (a list for "O")"""
+    if numpy is not None:
+        return numpy.array(values, dtype={"q": numpy.int64, "b": bool,
+                                          "O": object}[typecode])
+    return list(values) if typecode == "O" else array(typecode, values)
+
+
+class RepoTable:
+    """Columnar view of repos: one array per field.
+    Columns are NumPy arrays when NumPy is installed, `array.array`s
+    (and a list of names) otherwise. `license_key` and `language` hold
+    integer codes into `categories[field]`.
+    Example
+    -------
+    >>> table = RepoTable.from_repos(repos)
+    >>> table.where(license_key="mit", fork=False).sum("stargazers_count")
+    >>> table.count_by("license_key")
+    """
+    NUMBERS = ("stargazers_count", "forks_count", "open_issues_count",
+               "size")
+    FLAGS = ("archived", "fork")
+    CATEGORIES = ("license_key", "language")
+
+    def __init__(self, columns: Dict[str, Any],
+                 categories: Dict[str, List]) -> None:
+        """A table of equally long `columns`, see from_repos"""
+        self.columns = columns
+        self.categories = categories
+        self._numpy = None if type(columns["name"]) is list else numpy
+
+    @classmethod
+    def from_repos(cls, repos: Iterable[Union[Dict, Repo]]) -> "RepoTable":
+        """The columns of repo payloads or Repo records (whose fields
+        other than name and license come from Repo.extra). Missing
+        counts are 0 and missing flags False.
+        """
+        names, licenses = [], []
+        fields = (*cls.NUMBERS, *cls.FLAGS, "language")
+        values: Dict[str, List] = {field: [] for field in fields}
+        for repo in repos:
+            names.append(_repo_name(repo))
+            licenses.append(_repo_license(repo))
+            payload = (repo.extra or {}) if type(repo) is Repo else repo
+            for field in fields:
+                values[field].append(payload.get(field))
+        values["license_key"] = licenses
+        columns = {"name": _column(names, "O")}
+        categories = {}
+        for field in cls.CATEGORIES:
+            codes: Dict[Any, int] = {}
+            columns[field] = _column(
+                [codes.setdefault(value, len(codes))
+                 for value in values[field]], "q")
+            categories[field] = list(codes)
+        for field in cls.NUMBERS:
+            columns[field] = _column([value or 0 for value in values[field]],
+                                     "q")
+        for field in cls.FLAGS:
+            columns[field] = _column([bool(value) for value in values[field]],
+                                     "b")
+        return cls(columns, categories)
+
+    def __len__(self) -> int:
+        """Number of repos"""
+        return len(self.columns["name"])
+
+    def values(self, field: str) -> List:
+        """The values of `field`, repo by repo"""
+        column = self.columns[field]
+        if field in self.categories:
+            categories = self.categories[field]
+            return [categories[code] for code in column]
+        if field in self.FLAGS:
+            return [bool(flag) for flag in column]
+        return list(column) if type(column) is list else column.tolist()
+
+    def names(self) -> List[str]:
+        """Repo names, what public_repos lists"""
+        return self.values("name")
+
+    def mask(self, **conditions: Any) -> Any:
+        """Which repos have every `field=value`, as a bool array or list"""
+        np = self._numpy
+        keep = [True] * len(self) if np is None else \
+            np.ones(len(self), dtype=bool)
+        for field, value in conditions.items():
+            column = self.columns[field]
+            if field in self.categories:
+                try:
+                    value = self.categories[field].index(value)
+                except ValueError:
+                    value = -1
+            if np is None:
+                keep = [kept and item == value
+                        for kept, item in zip(keep, column)]
+            else:
+                keep &= column == value
+        return keep
+
+    def where(self, **conditions: Any) -> "RepoTable":
+        """The repos having every `field=value`, e.g. archived=False"""
+        keep = self.mask(**conditions)
+        if self._numpy is not None:
+            columns = {field: column[keep]
+                       for field, column in self.columns.items()}
+        else:
+            columns = {field: list(compress(column, keep))
+                       if type(column) is list
+                       else array(column.typecode, compress(column, keep))
+                       for field, column in self.columns.items()}
+        return type(self)(columns, self.categories)
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        """How many repos have each value of `field`"""
+        column = self.columns[field]
+        np = self._numpy
+        if field in self.categories:
+            categories = self.categories[field]
+            if np is None:
+                counts = [0] * len(categories)
+                for code in column:
+                    counts[code] += 1
+            else:
+                counts = np.bincount(column,
+                                     minlength=len(categories)).tolist()
+            return {category: count
+                    for category, count in zip(categories, counts) if count}
+        if np is None:
+            counts = Counter(column)
+        else:
+            values, totals = np.unique(column, return_counts=True)
+            counts = dict(zip(values.tolist(), totals.tolist()))
+        if field in self.FLAGS:
+            return {bool(flag): count for flag, count in counts.items()}
+        return dict(counts)
+
+    def sum(self, field: str) -> int:
+        """Total of a number (or flag) column"""
+        column = self.columns[field]
+        return sum(column) if self._numpy is None else int(column.sum())
+
 
 class GithubOrgClient:
     """A Githib org client
     """
     ORG_URL = "https://api.github.com/orgs/{org}"
+    REPO_FIELDS: Fields = ("name", ("license", "key"))
 
-    def __init__(self, org_name: str) -> None:
-        """Init method of GithubOrgClient"""
+    def __init__(self, org_name: str, ttl: Optional[float] = None,
+                 fields: Optional[Fields] = None, compact: bool = False,
+                 extra_fields: Sequence[str] = (),
+                 incremental: bool = False) -> None:
+        """Init method of GithubOrgClient
+        `ttl` is how many seconds `org` and `repos_payload` stay cached,
+        forever when None. `fields` keeps only these fields of each repo
+        (REPO_FIELDS being all the client itself reads) while the repos
+        are stream-decoded, instead of whole repo payloads.
+        `compact` holds the repos as Repo records instead, keeping the
+        top-level `extra_fields` in Repo.extra.
+        `incremental` makes the first repos_payload follow every page, and
+        every one after it fetch only the repos updated since, merged by
+        id into the previous one (see refresh); id and updated_at are
+        then kept in `fields`/Repo.extra.
+        """
         self._org_name = org_name
+        self._ttl = ttl
+        self._fields = fields
+        self._compact = compact
+        self._extra_fields = tuple(extra_fields)
+        self._incremental = incremental
+        self._synced: Optional[Tuple[List, Dict[Any, int], str]] = None
+        self._payload_key: Optional[Tuple[int, int]] = None
+        if incremental:
+            version_fields = tuple(field for field in ("id", "updated_at")
+                                   if field not in self._extra_fields)
+            if compact:
+                self._extra_fields += version_fields
+            elif fields is not None:
+                self._fields = (*fields, *version_fields)
+        if compact:
+            self._fields = (*self.REPO_FIELDS, *self._extra_fields)
 
-    @memoize
+    @memoize(ttl=lambda self: self._ttl)
     def org(self) -> Dict:
         """Memoize org"""
         return get_json(self.ORG_URL.format(org=self._org_name))
@@ -32,27 +275,255 @@ class GithubOrgClient:
         """Public repos URL"""
         return self.org["repos_url"]
 
-    @memoize
-    def repos_payload(self) -> Dict:
+    @memoize(ttl=lambda self: self._ttl)
+    def repos_payload(self) -> Union[List[Dict], List[Repo]]:
         """Memoize repos payload"""
-        return get_json(self._public_repos_url)
+        if self._synced is not None:
+            return self._merge_updated(*self._synced)
+        if self._incremental:
+            # every page, as the merges follow every page of updates
+            json_payload = list(self._iter_repos(
+                "{}?per_page=100".format(self._public_repos_url)))
+        else:
+            json_payload = get_json(self._public_repos_url,
+                                    fields=self._fields)
+            if self._compact:
+                json_payload = self._to_repos(json_payload)
+        if self._incremental:
+            positions = {}
+            newest = ""
+            for position, repo in enumerate(json_payload):
+                repo_id, updated_at = _repo_version(repo)
+                positions[repo_id] = position
+                newest = max(newest, updated_at)
+            self._synced = (json_payload, positions, newest)
+        if json_payload is not getattr(self, "_repos_payload", None):
+            # a new payload; a 304 hands back the expired one, still set
+            self._payload_key = None
+        return json_payload
+
+    def _merge_updated(self, json_payload: List, positions: Dict[Any, int],
+                       newest: str) -> List:
+        """A copy of `json_payload` with the repos updated since `newest`.
+        Repos are asked for most recently updated first and pages are
+        followed only until one older than `newest`. Updated repos take
+        the place of their previous version, new ones are appended, and
+        license_index is carried over unless a name or license changed.
+        Nothing is kept until every page is merged, so a failed refresh
+        leaves the last synced payload as it was.
+        """
+        url = "{}?sort=updated&direction=desc&per_page=100".format(
+            self._public_repos_url)
+        since = newest
+        updated = takewhile(lambda repo: _repo_version(repo)[1] >= since,
+                            self._iter_repos(url))
+        merged = list(json_payload)
+        positions = dict(positions)
+        seen = set()
+        reindex = False
+        for repo in updated:
+            repo_id, updated_at = _repo_version(repo)
+            if repo_id in seen:
+                continue
+            seen.add(repo_id)
+            newest = max(newest, updated_at)
+            position = positions.get(repo_id)
+            if position is None:
+                positions[repo_id] = len(merged)
+                merged.append(repo)
+                reindex = True
+                continue
+            previous = merged[position]
+            merged[position] = repo
+            if _repo_name(previous) != _repo_name(repo) or \
+                    _repo_license(previous) != _repo_license(repo):
+                reindex = True
+        key = self._payload_key
+        self._payload_key = None
+        cached = getattr(self, "_license_index", None)
+        if not reindex and cached is not None and \
+                key == (id(json_payload), cached[0]):
+            self._license_index = (self._payload_version(merged), cached[1])
+        self._synced = (merged, positions, newest)
+        return merged
+
+    def _to_repos(self, json_payload: List[Dict]) -> List[Repo]:
+        """Repo records of a repos payload"""
+        return [Repo.from_payload(repo, self._extra_fields)
+                for repo in json_payload]
+
+    def refresh(self, full: bool = False) -> None:
+        """Drop the cached org and repos so the next access fetches them
+        An incremental client fetches only the updated repos unless
+        `full`, which also drops the repos deleted since.
+        """
+        invalidate(self)
+        if full:
+            self._synced = None
+
+    def _payload_version(self, json_payload: List) -> int:
+        """Version of `json_payload`, a new one unless it is the payload
+        versioned last. repos_payload resets it on every fetch, so the
+        id of a payload since dropped is never taken for the next one.
+        """
+        key = self._payload_key
+        if key is None or key[0] != id(json_payload):
+            key = self._payload_key = (id(json_payload),
+                                       next(_payload_versions))
+        return key[1]
+
+    def _per_payload(self, attr_name: str,
+                     build: Callable[[List], Any]) -> Any:
+        """`build(repos_payload)`, kept in `attr_name` along with the
+        version of the payload it was built from until repos_payload
+        changes. Only the version is kept, not the payload itself.
+        """
+        json_payload = self.repos_payload
+        version = self._payload_version(json_payload)
+        cached = getattr(self, attr_name, None)
+        if cached is None or cached[0] != version:
+            cached = (version, build(json_payload))
+            setattr(self, attr_name, cached)
+        return cached[1]
+
+    @property
+    def license_index(self) -> Dict[Optional[str], List[str]]:
+        """Repo names by license key, None holding repos without one
+        Built once per repos_payload, so it follows its ttl and refresh.
+        """
+        return self._per_payload("_license_index", self.build_license_index)
+
+    @property
+    def repo_table(self) -> RepoTable:
+        """Columnar view of repos_payload, built once per repos_payload.
+        public_repos(license) is repo_table.where(license_key=license)
+        .names().
+        """
+        return self._per_payload("_repo_table", RepoTable.from_repos)
 
     def public_repos(self, license: str = None) -> List[str]:
         """Public repos"""
         json_payload = self.repos_payload
-        public_repos = [
-            repo["name"] for repo in json_payload
-            if license is None or self.has_license(repo, license)
-        ]
+        with timed("public_repos"):
+            if license is not None:
+                return list(self.license_index.get(license, ()))
+            public_repos = [_repo_name(repo) for repo in json_payload]
 
         return public_repos
 
+    def iter_repos(self) -> Iterator[Union[Dict, Repo]]:
+        """Iterate over every repo of the org, one page at a time"""
+        yield from self._iter_repos(self._public_repos_url)
+
+    def _iter_repos(self, url: str) -> Iterator[Union[Dict, Repo]]:
+        """Iterate over the repos listed at `url`, one page at a time"""
+        for page in iter_json_pages(url, fields=self._fields):
+            yield from self._to_repos(page) if self._compact else page
+
+    def iter_public_repos(self, license: str = None) -> Iterator[str]:
+        """Lazy public_repos following every page of the repos list"""
+        for repo in self.iter_repos():
+            if license is None or self.has_license(repo, license):
+                yield _repo_name(repo)
+
+    @classmethod
+    def public_repos_many(cls, orgs: Iterable[str], license: str = None,
+                          max_concurrency: int = 8
+                          ) -> Dict[str, Union[List[str], Exception]]:
+        """public_repos of several orgs, fetched in parallel
+        At most `max_concurrency` orgs are fetched at a time. An org whose
+        fetch raised maps to the exception instead of its repos.
+        """
+        def fetch(org: str) -> Union[List[str], Exception]:
+            """public_repos of one org, or what it raised"""
+            try:
+                return cls(org).public_repos(license)
+            except Exception as exc:
+                return exc
+
+        orgs = list(dict.fromkeys(orgs))
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return dict(zip(orgs, pool.map(fetch, orgs)))
+
+    @staticmethod
+    def build_license_index(repos: Iterable[Union[Dict, Repo]]
+                            ) -> Dict[Optional[str], List[str]]:
+        """Static: group repo names by license key in a single pass"""
+        index: Dict[Optional[str], List[str]] = {}
+        for repo in repos:
+            if type(repo) is Repo:
+                index.setdefault(repo.license_key, []).append(repo.name)
+                continue
+            try:
+                key = _license_key(repo)
+            except KeyError:
+                key = None
+            index.setdefault(key, []).append(repo["name"])
+        return index
+
     @staticmethod
-    def has_license(repo: Dict[str, Dict], license_key: str) -> bool:
+    def has_license(repo: Union[Dict[str, Dict], Repo],
+                    license_key: str) -> bool:
         """Static: has_license"""
         assert license_key is not None, "license_key cannot be None"
+        if type(repo) is Repo:
+            return repo.license_key == license_key
         try:
-            has_license = access_nested_map(repo, ("license", "key")) == license_key
+            has_license = _license_key(repo) == license_key
         except KeyError:
             return False
         return has_license
+
+
+class AsyncGithubOrgClient:
+    """An asyncio Githib org client
+    `org` and `repos_payload` are awaitable, memoized properties.
+    """
+    ORG_URL = GithubOrgClient.ORG_URL
+
+    def __init__(self, org_name: str) -> None:
+        """Init method of AsyncGithubOrgClient"""
+        self._org_name = org_name
+
+    @async_memoize
+    async def org(self) -> Dict:
+        """Memoize org"""
+        return await async_get_json(self.ORG_URL.format(org=self._org_name))
+
+    @async_memoize
+    async def repos_payload(self) -> Dict:
+        """Memoize repos payload"""
+        org = await self.org
+        return await async_get_json(org["repos_url"])
+
+    async def public_repos(self, license: str = None) -> List[str]:
+        """Public repos"""
+        json_payload = await self.repos_payload
+        return [
+            repo["name"] for repo in json_payload
+            if license is None or self.has_license(repo, license)
+        ]
+
+    @classmethod
+    async def public_repos_many(cls, orgs: Iterable[str],
+                                license: str = None, max_concurrency: int = 8
+                                ) -> Dict[str, Union[List[str], Exception]]:
+        """public_repos of several orgs, fetched concurrently
+        At most `max_concurrency` orgs are fetched at a time. An org whose
+        fetch raised maps to the exception instead of its repos.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(org: str) -> Union[List[str], Exception]:
+            """public_repos of one org, or what it raised"""
+            async with semaphore:
+                try:
+                    return await cls(org).public_repos(license)
+                except Exception as exc:
+                    return exc
+
+        orgs = list(dict.fromkeys(orgs))
+        results = await asyncio.gather(*(fetch(org) for org in orgs))
+        return dict(zip(orgs, results))
+
+    has_license = staticmethod(GithubOrgClient.has_license)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""A local stand-in for the parts of the GitHub API used by the client.
+"""
+import gzip
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from fixtures import TEST_PAYLOAD
+
+
+def _encode(payload: Any) -> Tuple[bytes, str]:
+    """JSON body of `payload` and its ETag"""
+    body = json.dumps(payload).encode()
+    return body, '"{}"'.format(hashlib.sha1(body).hexdigest())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serve `/orgs/<org>` and `/orgs/<org>/repos` from the server state"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    _quota: Optional[Dict[str, str]] = None
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Keep the benchmarks and tests quiet"""
+
+    def setup(self) -> None:
+        """Count every new TCP connection"""
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        """Route a GET request"""
+        with self.server.lock:
+            self.server.requests += 1
+            self._quota = quota = self.server.take_quota()
+        if quota is not None and quota["X-RateLimit-Remaining"] == "-1":
+            quota["X-RateLimit-Remaining"] = "0"
+            self._send_json({"message": "API rate limit exceeded"},
+                            status=403)
+            return
+        delay = self.server.delay
+        delay = delay() if callable(delay) else delay
+        if delay:
+            time.sleep(delay)
+        if self.server.error_rate and \
+                self.server.random.random() < self.server.error_rate:
+            self._send_json({"message": "Server Error"}, status=503)
+            return
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "orgs":
+            self._send_json({
+                "login": parts[1],
+                "repos_url": "{}/orgs/{}/repos".format(
+                    self.server.base_url, parts[1]),
+            })
+        elif len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repos":
+            self._send_repos(url.path, query)
+        else:
+            self._send_json({"message": "Not Found"}, status=404)
+
+    def _send_repos(self, path: str, query: Dict[str, List[str]]) -> None:
+        """Send one page of the repos list with its Link header.
+        `sort` (created, updated, pushed or full_name) and `direction`
+        order the list like GitHub does, `per_page` pages it (up to the
+        server's own per_page).
+        """
+        sort = query.get("sort", [None])[0]
+        direction = query.get("direction", [
+            "asc" if sort == "full_name" else "desc"])[0]
+        order = (sort, direction) if sort else ()
+        repos = self.server.ordered(*order) if sort else self.server.repos
+        per_page = self.server.per_page
+        if "per_page" in query:
+            asked = int(query["per_page"][0])
+            per_page = asked if per_page is None else min(asked, per_page)
+        if per_page is None:
+            self._send_body(self.server.encoded(("repos", *order),
+                                                lambda: repos))
+            return
+        page = int(query.get("page", ["1"])[0])
+        start = (page - 1) * per_page
+        headers = {}
+        if start + per_page < len(repos):
+            query["page"] = [str(page + 1)]
+            headers["Link"] = '<{}{}?{}>; rel="next"'.format(
+                self.server.base_url, path, urlencode(query, doseq=True))
+        self._send_body(self.server.encoded(
+            ("repos", page, per_page, *order),
+            lambda: repos[start:start + per_page]), headers=headers)
+
+    def _send_json(self, payload: Any, status: int = 200,
+                   headers: Optional[Dict[str, str]] = None) -> None:
+        """Send `payload` as a JSON body"""
+        self._send_body(_encode(payload), status, headers)
+
+    def _send_body(self, encoded: Tuple[bytes, str], status: int = 200,
+                   headers: Optional[Dict[str, str]] = None) -> None:
+        """Send a JSON body, or a 304 when its ETag matches.
+        The body is gzipped when the server compresses and the client
+        accepts it.
+        """
+        body, etag = encoded
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            with self.server.lock:
+                self.server.not_modified += 1
+            status, body = 304, b""
+        gzipped = bool(body) and self.server.compress and \
+            "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = self.server.gzipped(etag, body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if self.server.compress:
+            self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        for name, value in {**(self._quota or {}), **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubGithubServer(ThreadingHTTPServer):
+    """A threaded HTTP server answering like api.github.com.
+    Every org shares the same `repos` list, `fixtures.TEST_PAYLOAD`'s
+    by default. Use it as a context manager to serve in the background.
+    Example
+    -------
+    >>> with StubGithubServer() as server:
+    ...     GithubOrgClient.ORG_URL = server.org_url
+    """
+    daemon_threads = True
+
+    def __init__(self, repos: Optional[List[Dict]] = None,
+                 per_page: Optional[int] = None,
+                 delay: Union[float, Callable[[], float]] = 0,
+                 rate_limit: Optional[int] = None,
+                 rate_window: float = 1.0, error_rate: float = 0,
+                 seed: Optional[int] = None, compress: bool = False
+                 ) -> None:
+        """Bind on a free local port
+        `per_page` paginates the repos list, `delay` is how many seconds
+        every answer waits, or a function drawing them. `rate_limit`
+        allows that many requests per `rate_window` seconds and answers
+        403 beyond, with GitHub's X-RateLimit-* and Retry-After headers.
+        `error_rate` is the share of requests answered with a 503.
+        `compress` gzips the bodies of clients accepting it.
+        """
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self._bodies: Dict[Tuple, Any] = {}
+        self.repos = TEST_PAYLOAD[0][1] if repos is None else repos
+        self.per_page = per_page
+        self.delay = delay
+        self.error_rate = error_rate
+        self.compress = compress
+        self.random = random.Random(seed)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.throttled = 0
+        self._window_reset = 0.0
+        self._window_used = 0
+        self.requests = 0
+        self.connections = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def repos(self) -> List[Dict]:
+        """The repos list served for every org"""
+        return self._repos
+
+    @repos.setter
+    def repos(self, repos: List[Dict]) -> None:
+        """Serve a new repos list"""
+        with self.lock:
+            self._repos = repos
+            self._bodies = {}
+
+    def encoded(self, key: Tuple, payload: Callable[[], Any]
+                ) -> Tuple[bytes, str]:
+        """Body and ETag of `payload()`, encoded once per repos list"""
+        bodies = self._bodies
+        if key not in bodies:
+            bodies[key] = _encode(payload())
+        return bodies[key]
+
+    def ordered(self, sort: str, direction: str) -> List[Dict]:
+        """The repos list sorted on `sort`, once per repos list"""
+        bodies = self._bodies
+        key = ("sorted", sort, direction)
+        if key not in bodies:
+            field = sort if sort == "full_name" else sort + "_at"
+            bodies[key] = sorted(self.repos, key=lambda repo: repo[field],
+                                 reverse=direction == "desc")
+        return bodies[key]
+
+    def gzipped(self, etag: str, body: bytes) -> bytes:
+        """Gzipped `body`, compressed once per ETag"""
+        bodies = self._bodies
+        key = ("gzip", etag)
+        if key not in bodies:
+            bodies[key] = gzip.compress(body, compresslevel=6), etag
+        return bodies[key][0]
+
+    def take_quota(self) -> Optional[Dict[str, str]]:
+        """Count one request against the rate limit, call under `lock`.
+        Returns the rate-limit headers, X-RateLimit-Remaining being -1
+        when the request is over the limit.
+        """
+        if self.rate_limit is None:
+            return None
+        now = time.time()
+        if now >= self._window_reset:
+            self._window_reset = now + self.rate_window
+            self._window_used = 0
+        self._window_used += 1
+        remaining = self.rate_limit - self._window_used
+        headers = {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(remaining, -1)),
+            "X-RateLimit-Reset": "{:.3f}".format(self._window_reset),
+        }
+        if remaining < 0:
+            self.throttled += 1
+            headers["Retry-After"] = "{:.3f}".format(
+                self._window_reset - now)
+        return headers
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        """Ignore clients hanging up, as timed out or hedged ones do"""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the server"""
+        host, port = self.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    @property
+    def org_url(self) -> str:
+        """Drop-in value for GithubOrgClient.ORG_URL"""
+        return self.base_url + "/orgs/{org}"
+
+    def __enter__(self) -> "StubGithubServer":
+        """Start serving in a daemon thread"""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop serving and release the port"""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
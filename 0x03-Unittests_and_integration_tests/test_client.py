@@ -2,11 +2,20 @@
 """test_client.py
     This module contains the test cases for the client module
 """
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from parameterized import parameterized, parameterized_class
+import time
 import unittest
-from unittest.mock import patch, PropertyMock, Mock
-from client import GithubOrgClient
+import weakref
+from unittest.mock import patch, AsyncMock, PropertyMock, Mock
+import client
+from client import AsyncGithubOrgClient, GithubOrgClient, Repo, RepoTable
 from fixtures import TEST_PAYLOAD
+from stub_server import StubGithubServer
+import utils
 
 
 class TestGithubOrgClient(unittest.TestCase):
@@ -56,9 +65,182 @@ class TestGithubOrgClient(unittest.TestCase):
         mock_public_repos_url.assert_called_once()
         mock_get_json.assert_called_once()
 
+    @patch('client.iter_json_pages', return_value=iter([
+        [{"name": "a", "license": {"key": "mit"}}, {"name": "b"}],
+        [{"name": "c", "license": {"key": "mit"}}],
+    ]))
+    def test_iter_public_repos(self, mock_iter_json_pages):
+        """ Test iter_public_repos follows every page """
+        with patch('client.GithubOrgClient._public_repos_url',
+                   new_callable=PropertyMock,
+                   return_value="http://example.com"):
+            test_client = GithubOrgClient("google")
+            self.assertEqual(list(test_client.iter_public_repos("mit")),
+                             ["a", "c"])
+        mock_iter_json_pages.assert_called_once_with("http://example.com",
+                                                     fields=None)
+
+    @patch('client.get_json', side_effect=[{"v": 1}, {"v": 2}, {"v": 3}])
+    def test_org_ttl_and_refresh(self, mock_get_json):
+        """ org is fetched again once stale or after refresh """
+        test_client = GithubOrgClient("google", ttl=60)
+        with patch('utils.time.monotonic', return_value=0) as clock:
+            self.assertEqual(test_client.org, {"v": 1})
+            clock.return_value = 30
+            self.assertEqual(test_client.org, {"v": 1})
+            clock.return_value = 61
+            self.assertEqual(test_client.org, {"v": 2})
+        test_client.refresh()
+        self.assertEqual(test_client.org, {"v": 3})
+        self.assertEqual(mock_get_json.call_count, 3)
+
+    @parameterized.expand([
+        ({"name": "a", "license": {"key": "mit"}, "forks": 2},
+         (), Repo("a", "mit")),
+        ({"name": "a", "license": None, "forks": 2},
+         ("forks", "watchers"), Repo("a", None, {"forks": 2})),
+        ({"name": "a"}, ("forks",), Repo("a", None, {})),
+    ])
+    def test_repo_from_payload(self, repo, extra_fields, expected):
+        """ Test Repo.from_payload """
+        self.assertEqual(Repo.from_payload(repo, extra_fields), expected)
+
+    def test_single_flight(self):
+        """ Concurrent first accesses fetch org and repos only once """
+        def slow_get_json(url, fields=None):
+            """ A fetch slow enough for every thread to race it """
+            time.sleep(0.05)
+            if url.endswith("/repos"):
+                return [{"name": "a"}, {"name": "b"}]
+            return {"repos_url": url + "/repos"}
+
+        test_client = GithubOrgClient("google")
+        with patch('client.get_json', side_effect=slow_get_json) as mock, \
+                ThreadPoolExecutor(max_workers=32) as pool:
+            results = list(pool.map(lambda _: test_client.public_repos(),
+                                    range(256)))
+        self.assertEqual(results, [["a", "b"]] * 256)
+        self.assertEqual(mock.call_count, 2)
+
+    def test_public_repos_many(self):
+        """ Orgs are fetched in parallel and fail independently """
+        def fake_get_json(url, fields=None):
+            """ Repos of every org but `broken` """
+            if url.endswith("/broken"):
+                raise ValueError("broken")
+            if url.endswith("/repos"):
+                return [{"name": url.split("/")[-2],
+                         "license": {"key": "mit"}}]
+            return {"repos_url": url + "/repos"}
+
+        with patch('client.get_json', side_effect=fake_get_json):
+            results = GithubOrgClient.public_repos_many(
+                ["google", "broken", "abc", "google"], license="mit",
+                max_concurrency=2)
+        self.assertEqual(list(results), ["google", "broken", "abc"])
+        self.assertEqual(results["google"], ["google"])
+        self.assertEqual(results["abc"], ["abc"])
+        self.assertIsInstance(results["broken"], ValueError)
+
+    def test_license_index(self):
+        """ License queries are answered from one index per payload """
+        repos = [{"name": "a", "license": {"key": "mit"}},
+                 {"name": "b", "license": None},
+                 {"name": "c"},
+                 {"name": "d", "license": {"key": "mit"}}]
+        test_client = GithubOrgClient("google")
+        with patch('client.GithubOrgClient.repos_payload',
+                   new_callable=PropertyMock, return_value=repos) as payload:
+            self.assertEqual(test_client.license_index,
+                             {"mit": ["a", "d"], None: ["b", "c"]})
+            with patch.object(GithubOrgClient,
+                              'build_license_index') as build:
+                self.assertEqual(test_client.public_repos("mit"),
+                                 ["a", "d"])
+                self.assertEqual(test_client.public_repos("bsd"), [])
+                build.assert_not_called()
+
+            payload.return_value = [{"name": "e", "license": {"key": "bsd"}}]
+            self.assertEqual(test_client.public_repos("bsd"), ["e"])
+            self.assertEqual(test_client.public_repos("mit"), [])
+
+    @parameterized.expand([
+        ("numpy",),
+        ("array",),
+    ])
+    def test_repo_table(self, backend):
+        """ The columnar view answers like public_repos and plain loops """
+        if backend == "numpy" and client.numpy is None:
+            self.skipTest("numpy is not installed")
+        _, repos, expected_repos, apache2_repos = TEST_PAYLOAD[0]
+        test_client = GithubOrgClient("google")
+        with patch('client.numpy', None if backend == "array"
+                   else client.numpy), \
+                patch('client.GithubOrgClient.repos_payload',
+                      new_callable=PropertyMock, return_value=repos):
+            table = test_client.repo_table
+            self.assertIs(test_client.repo_table, table)
+            self.assertEqual(len(table), len(repos))
+            self.assertEqual(table.names(), test_client.public_repos())
+            self.assertEqual(table.names(), expected_repos)
+            self.assertEqual(table.where(license_key="apache-2.0").names(),
+                             apache2_repos)
+            for key in test_client.license_index:
+                self.assertEqual(table.where(license_key=key).names(),
+                                 test_client.license_index[key])
+            self.assertEqual(table.where(license_key="mit").names(), [])
+            self.assertEqual(
+                table.count_by("license_key"),
+                {key: len(names)
+                 for key, names in test_client.license_index.items()})
+            self.assertEqual(table.count_by("fork"), {
+                False: sum(not repo["fork"] for repo in repos),
+                True: sum(repo["fork"] for repo in repos)})
+            self.assertEqual(table.sum("stargazers_count"),
+                             sum(repo["stargazers_count"] for repo in repos))
+            kept = table.where(fork=False, language="Java")
+            self.assertEqual(kept.names(), [
+                repo["name"] for repo in repos
+                if not repo["fork"] and repo["language"] == "Java"])
+            self.assertEqual(kept.sum("forks_count"), sum(
+                repo["forks_count"] for repo in repos
+                if not repo["fork"] and repo["language"] == "Java"))
+            self.assertEqual(table.where(name="nope").count_by("language"),
+                             {})
+            compact = RepoTable.from_repos([Repo("a", "mit", {"forks": 2}),
+                                            Repo("b", None)])
+            self.assertEqual(compact.values("license_key"), ["mit", None])
+            self.assertEqual(compact.sum("forks_count"), 0)
+
+    @patch('client.get_json')
+    def test_derived_caches_release_payload(self, mock_get_json):
+        """ license_index and repo_table do not keep old payloads alive """
+        class Payload(list):
+            """ A repos payload that can be weakly referenced """
+
+        def get_json(url, fields=None):
+            """ The org, then a new payload on every repos fetch """
+            if url.endswith("/repos"):
+                return Payload([{"name": "a", "license": {"key": "mit"}}])
+            return {"repos_url": url + "/repos"}
+
+        mock_get_json.side_effect = get_json
+        test_client = GithubOrgClient("x")
+        ref = weakref.ref(test_client.repos_payload)
+        index = test_client.license_index
+        test_client.repo_table
+        self.assertIs(test_client.license_index, index)
+
+        test_client.refresh()
+        self.assertIsNone(ref())
+        self.assertEqual(test_client.public_repos("mit"), ["a"])
+        self.assertIsNot(test_client.license_index, index)
+
     @parameterized.expand([
         ({"license": {"key": "my_license"}}, "my_license", True),
-        ({"license": {"key": "other_license"}}, "my_license", False)
+        ({"license": {"key": "other_license"}}, "my_license", False),
+        (Repo("a", "my_license"), "my_license", True),
+        (Repo("a", None), "my_license", False),
     ])
     def test_has_license(self, repo, license_key, expected):
         """ unit-test for GithubOrgClient.has_license """
@@ -67,6 +249,59 @@ class TestGithubOrgClient(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestAsyncGithubOrgClient(unittest.IsolatedAsyncioTestCase):
+    """ TestAsyncGithubOrgClient class
+    """
+    @patch('client.async_get_json', new_callable=AsyncMock)
+    async def test_org(self, mock_get_json):
+        """ Test org is awaited once for concurrent awaiters """
+        mock_get_json.return_value = {"login": "google"}
+        test_client = AsyncGithubOrgClient("google")
+        results = await asyncio.gather(*(test_client.org for _ in range(5)))
+        self.assertEqual(results, [{"login": "google"}] * 5)
+        self.assertEqual(await test_client.org, {"login": "google"})
+        mock_get_json.assert_awaited_once_with(
+            "https://api.github.com/orgs/google")
+
+    @patch('client.async_get_json', new_callable=AsyncMock)
+    async def test_public_repos(self, mock_get_json):
+        """ Test public_repos with and without a license """
+        mock_get_json.side_effect = [
+            {"repos_url": "http://example.com"},
+            [{"name": "a", "license": {"key": "mit"}}, {"name": "b"}],
+        ]
+        test_client = AsyncGithubOrgClient("google")
+        self.assertEqual(await test_client.public_repos(), ["a", "b"])
+        self.assertEqual(await test_client.public_repos("mit"), ["a"])
+        mock_get_json.assert_awaited_with("http://example.com")
+        self.assertEqual(mock_get_json.await_count, 2)
+
+    async def test_public_repos_many(self):
+        """ Concurrency is bounded and orgs fail independently """
+        running, peak = 0, 0
+
+        async def fake_get_json(url):
+            """ Repos of every org but `broken`, tracking concurrency """
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if url.endswith("/broken"):
+                raise ValueError("broken")
+            if url.endswith("/repos"):
+                return [{"name": url.split("/")[-2]}]
+            return {"repos_url": url + "/repos"}
+
+        orgs = ["org{}".format(i) for i in range(10)] + ["broken"]
+        with patch('client.async_get_json', side_effect=fake_get_json):
+            results = await AsyncGithubOrgClient.public_repos_many(
+                orgs, max_concurrency=3)
+        self.assertEqual(peak, 3)
+        self.assertEqual(results["org4"], ["org4"])
+        self.assertIsInstance(results["broken"], ValueError)
+
+
 @parameterized_class(('org_payload', 'repos_payload',
                       'expected_repos', 'apache2_repos'),
                      TEST_PAYLOAD)
@@ -121,3 +356,288 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         self.assertEqual(
                 test_class.public_repos('apache-2.0'), self.apache2_repos)
         self.mock_get.assert_called()
+
+
+class TestStubServerGithubOrgClient(unittest.TestCase):
+    ''' TestStubServerGithubOrgClient class
+        Run GithubOrgClient against a local stand-in server
+    '''
+    def setUp(self):
+        ''' Start the stand-in server '''
+        self.server = StubGithubServer(per_page=4).__enter__()
+        self.url_patcher = patch.object(GithubOrgClient, 'ORG_URL',
+                                        self.server.org_url)
+        self.url_patcher.start()
+
+    def tearDown(self):
+        ''' Stop the stand-in server '''
+        self.url_patcher.stop()
+        utils.close_session()
+        utils.enable_conditional_requests(False)
+        utils.clear_validators()
+        utils.set_rate_limiter(None)
+        utils.set_retry_policy(None)
+        utils.set_disk_cache(None)
+        utils.set_json_decoder(None)
+        self.server.__exit__(None, None, None)
+
+    def test_iter_public_repos(self):
+        ''' Every page is followed '''
+        _, repos, expected_repos, apache2_repos = TEST_PAYLOAD[0]
+        test_client = GithubOrgClient('google')
+        self.assertEqual(list(test_client.iter_public_repos()),
+                         expected_repos)
+        self.assertEqual(list(test_client.iter_public_repos('apache-2.0')),
+                         apache2_repos)
+
+    def test_fields(self):
+        ''' Repos are stream-decoded down to the fields the client reads '''
+        self.server.per_page = None
+        _, repos, expected_repos, apache2_repos = TEST_PAYLOAD[0]
+        test_client = GithubOrgClient('google',
+                                      fields=GithubOrgClient.REPO_FIELDS)
+        self.assertEqual(test_client.public_repos(), expected_repos)
+        self.assertEqual(test_client.public_repos('apache-2.0'),
+                         apache2_repos)
+        self.assertEqual(test_client.repos_payload[0],
+                         {'name': 'episodes.dart',
+                          'license': {'key': 'bsd-3-clause'}})
+
+    def test_compact(self):
+        ''' Repos are held as Repo records '''
+        self.server.per_page = None
+        _, repos, expected_repos, apache2_repos = TEST_PAYLOAD[0]
+        test_client = GithubOrgClient('google', compact=True,
+                                      extra_fields=['forks'])
+        self.assertEqual(test_client.public_repos(), expected_repos)
+        self.assertEqual(test_client.public_repos('apache-2.0'),
+                         apache2_repos)
+        self.assertEqual(test_client.repos_payload[0],
+                         Repo('episodes.dart', 'bsd-3-clause', {'forks': 22}))
+        self.assertEqual(list(test_client.iter_public_repos('apache-2.0')),
+                         apache2_repos)
+
+    def test_rate_limited(self):
+        ''' Shared pacing keeps threads under the server's limit '''
+        self.server.rate_limit, self.server.rate_window = 4, 0.2
+        limiter = utils.RateLimiter(rate=20)
+        utils.set_rate_limiter(limiter)
+        results = GithubOrgClient.public_repos_many(
+            ['org{}'.format(i) for i in range(6)], max_concurrency=4)
+        self.assertEqual(list(results.values()),
+                         [TEST_PAYLOAD[0][2][:4]] * 6)
+        self.assertEqual(self.server.requests, 12)
+        self.assertEqual(self.server.throttled, 0)
+        self.assertIsNotNone(limiter.remaining)
+
+    def test_rate_limit_retried(self):
+        ''' A throttled answer is retried after Retry-After '''
+        self.server.rate_limit, self.server.rate_window = 1, 0.2
+        utils.get_json(self.server.org_url.format(org='other'))
+        utils.set_rate_limiter(utils.RateLimiter(rate=1000, burst=2))
+        self.assertEqual(GithubOrgClient('google').public_repos(),
+                         TEST_PAYLOAD[0][2][:4])
+        self.assertGreaterEqual(self.server.throttled, 1)
+
+    def test_retried(self):
+        ''' Server errors are retried '''
+        self.server.error_rate = 0.3
+        self.server.random.seed(0)
+        utils.set_retry_policy(utils.RetryPolicy(retries=10, backoff=0.001))
+        results = GithubOrgClient.public_repos_many(
+            ['org{}'.format(i) for i in range(8)])
+        self.assertEqual(list(results.values()),
+                         [TEST_PAYLOAD[0][2][:4]] * 8)
+        self.assertGreater(self.server.requests, 16)
+
+    def test_disk_cache(self):
+        ''' A new process starts warm from the disk cache '''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite')
+            utils.set_disk_cache(utils.DiskCache(path))
+            GithubOrgClient('google').public_repos()
+            self.assertEqual(self.server.requests, 2)
+
+            utils.set_disk_cache(utils.DiskCache(path))
+            self.assertEqual(GithubOrgClient('google').public_repos(),
+                             TEST_PAYLOAD[0][2][:4])
+            self.assertEqual(self.server.requests, 2)
+            self.assertEqual(utils.get_disk_cache().hits, 2)
+
+    def test_metrics(self):
+        ''' Fetches and filtering are recorded '''
+        metrics = utils.enable_metrics()
+        self.addCleanup(utils.disable_metrics)
+        test_client = GithubOrgClient('google')
+        test_client.public_repos()
+        test_client.public_repos('apache-2.0')
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['timers']['public_repos']['count'], 2)
+        self.assertEqual(
+            snapshot['requests'][self.server.base_url + '/orgs/google']
+            ['count'], 1)
+        self.assertGreater(
+            snapshot['requests'][self.server.base_url + '/orgs/google/repos']
+            ['bytes'], 0)
+
+    def test_incremental_refresh(self):
+        ''' Refreshes fetch the updated repos only and merge them by id '''
+        repos = [dict(repo) for repo in TEST_PAYLOAD[0][1]]
+        self.server.repos = repos
+        test_client = GithubOrgClient('google', incremental=True)
+        names = test_client.public_repos()
+        index = test_client.license_index
+
+        self.server.per_page = 3
+        repos = [dict(repo) for repo in repos]
+        repos[1].update(stargazers_count=1, updated_at='2030-01-01T00:00:00Z')
+        self.server.repos = repos
+        requests = self.server.requests
+        test_client.refresh()
+        self.assertEqual(test_client.repos_payload[1]['stargazers_count'], 1)
+        self.assertEqual(test_client.public_repos(), names)
+        self.assertIs(test_client.license_index, index)
+        self.assertEqual(self.server.requests - requests, 2)
+
+        repos = [dict(repo) for repo in repos]
+        repos[0].update(license={'key': 'mit'},
+                        updated_at='2031-01-01T00:00:00Z')
+        repos.append(dict(repos[2], id=1, name='new',
+                          updated_at='2031-01-01T00:00:00Z'))
+        self.server.repos = repos
+        test_client.refresh()
+        self.assertEqual(test_client.public_repos(), names + ['new'])
+        self.assertEqual(test_client.public_repos('mit'), [names[0]])
+
+        self.server.repos = repos[:-1]
+        test_client.refresh()
+        self.assertEqual(len(test_client.repos_payload), len(repos))
+        test_client.refresh(full=True)
+        self.assertEqual(test_client.public_repos(), names)
+
+    def test_incremental_first_sync_paginated(self):
+        ''' The first sync follows every page, like the merges after it '''
+        self.server.per_page = 3
+        repos = [dict(repo) for repo in TEST_PAYLOAD[0][1]]
+        self.server.repos = repos
+        test_client = GithubOrgClient('google', incremental=True)
+        self.assertEqual(test_client.repos_payload, repos)
+
+        repos = [dict(repo) for repo in repos]
+        repos[5].update(stargazers_count=1, updated_at='2030-01-01T00:00:00Z')
+        self.server.repos = repos
+        test_client.refresh()
+        self.assertEqual(test_client.repos_payload, repos)
+
+    def test_incremental_refresh_several(self):
+        ''' Repos updated at different times are all merged '''
+        repos = [dict(repo) for repo in TEST_PAYLOAD[0][1]]
+        self.server.repos = repos
+        test_client = GithubOrgClient('google', incremental=True)
+        test_client.public_repos()
+
+        self.server.per_page = 2
+        repos = [dict(repo) for repo in repos]
+        for count, position in enumerate((4, 1, 6), 1):
+            repos[position].update(stargazers_count=count, updated_at=(
+                '2030-01-0{}T00:00:00Z'.format(count)))
+        self.server.repos = repos
+        test_client.refresh()
+        self.assertEqual(test_client.repos_payload, repos)
+
+    def test_incremental_refresh_failed(self):
+        ''' A refresh failing midway keeps the last synced payload '''
+        repos = [dict(repo) for repo in TEST_PAYLOAD[0][1]]
+        self.server.repos = repos
+        test_client = GithubOrgClient('google', incremental=True)
+        test_client.public_repos()
+        payload = test_client.repos_payload
+
+        self.server.per_page = 2
+        repos = [dict(repo) for repo in repos]
+        repos.append(dict(repos[0], id=1, name='new',
+                          updated_at='2030-01-02T00:00:00Z'))
+        repos[4].update(updated_at='2030-01-01T00:00:00Z')
+        repos[6].update(updated_at='2029-01-01T00:00:00Z')
+        self.server.repos = repos
+        request = utils._request
+        pages = []
+
+        def failing(url, **kwargs):
+            ''' Fail the second page '''
+            pages.append(url)
+            if len(pages) == 2:
+                raise ConnectionError('page 2')
+            return request(url, **kwargs)
+
+        test_client.refresh()
+        test_client.org
+        with patch('utils._request', side_effect=failing):
+            with self.assertRaises(ConnectionError):
+                test_client.repos_payload
+        self.assertEqual(test_client._synced[0], payload)
+        self.assertEqual(len(test_client._synced[1]), len(payload))
+
+        test_client.refresh()
+        self.assertEqual(test_client.repos_payload, repos)
+        self.assertEqual(test_client.public_repos()[-1], 'new')
+
+    def test_compressed(self):
+        ''' Gzipped bodies decode the same, with every decoder '''
+        self.server.per_page = None
+        self.server.compress = True
+        url = self.server.base_url + '/orgs/google/repos'
+        utils.configure_session(accept_encoding='identity')
+        self.assertEqual(utils.get_json(url), TEST_PAYLOAD[0][1])
+        identity = self.server.bytes_sent
+        utils.configure_session(accept_encoding='gzip')
+        for decoder in (None, 'auto'):
+            utils.set_json_decoder(decoder)
+            self.assertEqual(utils.get_json(url), TEST_PAYLOAD[0][1])
+        self.assertLess(self.server.bytes_sent - identity, identity / 2)
+
+    def test_session_is_shared(self):
+        ''' Clients reuse the pooled keep-alive connection '''
+        utils.configure_session()
+        for org in ('google', 'abc', 'holberton'):
+            GithubOrgClient(org).repos_payload
+        self.assertEqual(self.server.requests, 6)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_conditional_refresh(self):
+        ''' Unchanged refreshes are answered with 304 '''
+        utils.enable_conditional_requests()
+        payloads = [GithubOrgClient('google').repos_payload
+                    for _ in range(3)]
+        self.assertEqual(payloads[0], payloads[2])
+        self.assertEqual(self.server.requests, 6)
+        self.assertEqual(self.server.not_modified, 4)
+
+    def test_conditional_revalidation_keeps_index(self):
+        ''' A 304 revalidation keeps license_index and repo_table '''
+        utils.enable_conditional_requests()
+        test_client = GithubOrgClient('google', ttl=0.01)
+        payload = test_client.repos_payload
+        index = test_client.license_index
+        table = test_client.repo_table
+        for _ in range(2):
+            time.sleep(0.02)
+            self.assertIs(test_client.repos_payload, payload)
+        self.assertEqual(self.server.not_modified, 4)
+        self.assertIs(test_client.license_index, index)
+        self.assertIs(test_client.repo_table, table)
+
+    def test_async_client(self):
+        ''' The async client fetches concurrently from the server '''
+        async def fetch_all():
+            ''' Fetch several orgs at once '''
+            with patch.object(AsyncGithubOrgClient, 'ORG_URL',
+                              self.server.org_url):
+                clients = [AsyncGithubOrgClient(org)
+                           for org in ('google', 'abc', 'holberton')]
+                return await asyncio.gather(
+                    *(c.public_repos('apache-2.0') for c in clients))
+
+        utils.configure_session()
+        self.assertEqual(asyncio.run(fetch_all()), [['dagger']] * 3)
+        self.assertEqual(self.server.requests, 6)
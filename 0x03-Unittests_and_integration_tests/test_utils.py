@@ -3,11 +3,26 @@
    This module contains the test cases for the utils module
 '''
 from parameterized import parameterized
+import asyncio
+import json
+import os
 import requests
+import tempfile
+import threading
+import time
 from typing import Any, Dict, List, Union
 import unittest
+from email.utils import formatdate
 from unittest.mock import patch, Mock
-from utils import access_nested_map, get_json, memoize
+import utils
+from utils import (DiskCache, access_nested_map, access_nested_maps,
+                   async_memoize, clear_validators, close_session,
+                   compile_path, configure_session, disable_metrics,
+                   enable_metrics, get_json, get_json_decoder, get_metrics,
+                   get_session, invalidate, iter_json_array, iter_json_pages,
+                   memoize, project, RateLimiter, RetryPolicy,
+                   set_disk_cache, set_json_decoder, set_memoize_limit,
+                   set_validators_limit, timed)
 
 
 class TestAccessNestedMap(unittest.TestCase):
@@ -55,6 +70,125 @@ class TestAccessNestedMap(unittest.TestCase):
             access_nested_map(nested_map, path)
 
 
+class TestCompilePath(unittest.TestCase):
+    '''
+        Test the compile_path and access_nested_maps methods
+        Methods:
+            test_compile_path - test that the compiled getter returns what
+            access_nested_map returns
+            test_compile_path_exception - test that it raises the same
+            KeyError as access_nested_map
+            test_access_nested_maps - test the batch form
+    '''
+    @parameterized.expand([
+        ({'a': 1}, ['a'], 1),
+        ({'a': {'b': 2}}, ['a'], {'b': 2}),
+        ({'a': {'b': 2}}, ['a', 'b'], 2),
+        ({'a': {'b': {'c': 3}}}, ['a', 'b', 'c'], 3),
+    ])
+    def test_compile_path(self, nested_map: Dict[str, Any],
+                          path: List[str], expected: Any) -> None:
+        '''
+            Test the compiled getter against access_nested_map
+        '''
+        self.assertEqual(compile_path(path)(nested_map), expected)
+        self.assertEqual(access_nested_map(nested_map, path), expected)
+
+    @parameterized.expand([
+        ({}, ['a'], 'a'),
+        ({'a': 1}, ['a', 'b'], 'b'),
+        ({'a': [1, 2]}, ['a', 0], 0),
+        ({'a': {'b': 'c'}}, ['a', 'b', 'c'], 'c'),
+    ])
+    def test_compile_path_exception(self, nested_map: Dict[str, Any],
+                                    path: List[str], key: Any) -> None:
+        '''
+            Test the compiled getter raises KeyError(key) on missing paths
+        '''
+        for getter in (compile_path(path),
+                       lambda m: access_nested_map(m, path)):
+            with self.assertRaises(KeyError) as raised:
+                getter(nested_map)
+            self.assertEqual(raised.exception.args, (key,))
+
+    def test_access_nested_maps(self) -> None:
+        '''
+            Test the batch form with and without a default
+        '''
+        repos = [{'license': {'key': 'mit'}}, {'license': None}, {}]
+        self.assertEqual(access_nested_maps(repos, ('license', 'key'), None),
+                         ['mit', None, None])
+        self.assertEqual(access_nested_maps(repos[:1], ('license', 'key')),
+                         ['mit'])
+        with self.assertRaises(KeyError):
+            access_nested_maps(repos, ('license', 'key'))
+
+
+class TestStreamingDecode(unittest.TestCase):
+    '''
+        Test project, iter_json_array and get_json(fields=...)
+        Methods:
+            test_project - test keeping only some key paths
+            test_iter_json_array - test decoding items across chunks
+            test_iter_json_array_exception - test malformed arrays
+            test_get_json_fields - test the streamed, projected get_json
+    '''
+    def test_project(self) -> None:
+        '''test_project method'''
+        repo = {'name': 'a', 'id': 1, 'owner': {'login': 'google'},
+                'license': {'key': 'mit', 'name': 'MIT'}}
+        self.assertEqual(project(repo, ['name', ('license', 'key')]),
+                         {'name': 'a', 'license': {'key': 'mit'}})
+        self.assertEqual(project([repo, {'name': 'b', 'license': None}],
+                                 ['name', ('license', 'key')]),
+                         [{'name': 'a', 'license': {'key': 'mit'}},
+                          {'name': 'b', 'license': None}])
+        self.assertEqual(project(repo, ['missing', ('owner',)]),
+                         {'owner': {'login': 'google'}})
+
+    @parameterized.expand([
+        (1,), (2,), (7,), (1000,),
+    ])
+    def test_iter_json_array(self, size: int) -> None:
+        '''
+            Items are the same whatever the chunk boundaries
+            Args:
+                size: chunk size
+        '''
+        items = [{'a': [1, 2.5, None]}, 12345, 'x ,]', True, [], {}]
+        text = ' [ ' + json.dumps(items)[1:-1] + ' ]\n'
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.assertEqual(list(iter_json_array(chunks)), items)
+        self.assertEqual(list(iter_json_array(['[', ']'])), [])
+
+    @parameterized.expand([
+        ('{"a": 1}',), ('[1, 2',), ('[1 2]',), ('',),
+    ])
+    def test_iter_json_array_exception(self, text: str) -> None:
+        '''
+            Malformed or truncated arrays raise ValueError
+            Args:
+                text: the whole body
+        '''
+        with self.assertRaises(ValueError):
+            list(iter_json_array([text]))
+
+    def test_get_json_fields(self) -> None:
+        '''test_get_json_fields method'''
+        body = json.dumps([{'name': 'a', 'id': 1, 'license': None},
+                           {'name': 'b', 'id': 2}]).encode()
+        mock_response = Mock(encoding='utf-8')
+        mock_response.iter_content.return_value = [body[:10], body[10:]]
+        with patch.object(requests, 'get',
+                          return_value=mock_response) as mock_method:
+            self.assertEqual(get_json('http://example.com', fields=['name']),
+                             [{'name': 'a'}, {'name': 'b'}])
+            mock_method.assert_called_once_with('http://example.com',
+                                                stream=True)
+            mock_response.json.assert_not_called()
+            mock_response.close.assert_called_once()
+
+
 class TestGetJson(unittest.TestCase):
     '''Test the get_json method
         Methods:
@@ -83,6 +217,414 @@ class TestGetJson(unittest.TestCase):
             mock_method.assert_called_once()
 
 
+class TestJsonDecoder(unittest.TestCase):
+    '''Test the decoder backends of get_json
+        Methods:
+            test_set_json_decoder - test that get_json parses the body
+            bytes with the chosen decoder instead of response.json()
+            test_auto - test that "auto" falls back to the stdlib parser
+    '''
+    def tearDown(self) -> None:
+        '''Go back to response.json()'''
+        set_json_decoder(None)
+
+    @parameterized.expand([
+        ('json',),
+        ('orjson',),
+    ])
+    def test_set_json_decoder(self, decoder: str) -> None:
+        '''test_set_json_decoder method'''
+        if decoder == 'orjson' and utils.orjson is None:
+            self.skipTest('orjson is not installed')
+        set_json_decoder(decoder)
+        self.assertEqual(get_json_decoder(), decoder)
+        mock_response = Mock(content=b'{"payload": [true, null]}')
+        with patch.object(requests, 'get', return_value=mock_response):
+            self.assertEqual(get_json('http://example.com'),
+                             {'payload': [True, None]})
+        mock_response.json.assert_not_called()
+
+    def test_auto(self) -> None:
+        '''test_auto method'''
+        set_json_decoder()
+        self.assertEqual(get_json_decoder(),
+                         'json' if utils.orjson is None else 'orjson')
+        with patch.object(utils, 'orjson', None):
+            set_json_decoder('auto')
+            self.assertEqual(get_json_decoder(), 'json')
+            with self.assertRaises(ImportError):
+                set_json_decoder('orjson')
+        with self.assertRaises(ValueError):
+            set_json_decoder('simplejson')
+        set_json_decoder(None)
+        self.assertIsNone(get_json_decoder())
+
+
+class TestConditionalGetJson(unittest.TestCase):
+    '''Test get_json with conditional requests
+        Methods:
+            test_not_modified - test that a 304 answer is served from the
+            body remembered with the ETag/Last-Modified validators
+            test_validators_limit - test that the least recently used
+            validators are forgotten past the limit
+    '''
+    def tearDown(self) -> None:
+        '''Forget the validators'''
+        clear_validators()
+        set_validators_limit(1024)
+
+    def test_not_modified(self) -> None:
+        '''test_not_modified method'''
+        first = Mock(status_code=200,
+                     headers={'ETag': '"v1"',
+                              'Last-Modified': 'Mon, 01 Jan 2024'})
+        first.json.return_value = {'payload': True}
+        second = Mock(status_code=304, headers={'ETag': '"v1"'})
+        with patch.object(requests, 'get',
+                          side_effect=[first, second]) as mock_method:
+            self.assertEqual(get_json('http://example.com', True),
+                             {'payload': True})
+            mock_method.assert_called_once_with('http://example.com')
+            self.assertIs(get_json('http://example.com', True),
+                          first.json.return_value)
+            mock_method.assert_called_with('http://example.com', headers={
+                'If-None-Match': '"v1"',
+                'If-Modified-Since': 'Mon, 01 Jan 2024'})
+            second.json.assert_not_called()
+
+    def test_validators_limit(self) -> None:
+        '''test_validators_limit method'''
+        def response(url: str, **kwargs: Any) -> Mock:
+            '''a 200 answer with an ETag, a 304 when revalidated'''
+            answer = Mock(status_code=304 if kwargs else 200,
+                          headers={'ETag': '"v1"'})
+            answer.json.return_value = {'url': url}
+            return answer
+
+        set_validators_limit(2)
+        with patch.object(requests, 'get',
+                          side_effect=response) as mock_method:
+            for url in ('http://a', 'http://b', 'http://a', 'http://c'):
+                self.assertEqual(get_json(url, True), {'url': url})
+            mock_method.assert_called_with('http://c')
+            self.assertEqual(get_json('http://a', True), {'url': 'http://a'})
+            mock_method.assert_called_with('http://a', headers={
+                'If-None-Match': '"v1"'})
+            get_json('http://b', True)
+            mock_method.assert_called_with('http://b')
+        set_validators_limit(0)
+        self.assertEqual(len(utils._validators), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    '''Test the RateLimiter class
+        Methods:
+            test_pacing - test that requests are spaced at the rate
+            test_update - test that the quota headers are followed
+    '''
+    def test_pacing(self) -> None:
+        '''test_pacing method'''
+        limiter = RateLimiter(rate=100, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+    def test_update(self) -> None:
+        '''test_update method'''
+        limiter = RateLimiter(rate=100)
+        reset = '{:.3f}'.format(time.time() + 60)
+        ok = Mock(status_code=200, headers={
+            'X-RateLimit-Remaining': '30', 'X-RateLimit-Reset': reset})
+        self.assertFalse(limiter.update(ok))
+        self.assertEqual(limiter.remaining, 30)
+        self.assertAlmostEqual(limiter._current_rate(), 0.5, places=1)
+        late = Mock(status_code=200, headers={
+            'X-RateLimit-Remaining': '31', 'X-RateLimit-Reset': reset})
+        limiter.update(late)
+        self.assertEqual(limiter.remaining, 30)
+
+        throttled = Mock(status_code=403, headers={
+            'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset,
+            'Retry-After': '60'})
+        self.assertTrue(limiter.update(throttled))
+        self.assertEqual(limiter.remaining, 0)
+        self.assertGreater(limiter.delay(), 59)
+
+    @parameterized.expand([
+        ('seconds', '30', 29, 30),
+        ('http_date', 30.0, 28, 31),
+        ('past_date', 'Wed, 21 Oct 2015 07:28:00 GMT', 0, 0),
+        ('garbage', 'soon', 0, 0),
+    ])
+    def test_retry_after(self, _: str, retry_after: Union[str, float],
+                         low: float, high: float) -> None:
+        '''test_retry_after method, a float being an HTTP date that many
+        seconds from now'''
+        if isinstance(retry_after, float):
+            retry_after = formatdate(time.time() + retry_after, usegmt=True)
+        limiter = RateLimiter(rate=1000)
+        throttled = Mock(status_code=429,
+                         headers={'Retry-After': retry_after})
+        self.assertTrue(limiter.update(throttled))
+        delay = limiter.delay()
+        self.assertGreaterEqual(delay, low)
+        self.assertLessEqual(delay, high)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    '''Test the RetryPolicy class
+        Methods:
+            test_retries - test that errors and 5xx answers are retried
+            test_retries_exhausted - test that the last error is raised
+            test_hedge - test that a slow request is hedged
+            test_hedge_delay - test the latency quantile hedging delay
+    '''
+    def test_retries(self) -> None:
+        '''test_retries method'''
+        answers = [requests.ConnectionError(), Mock(status_code=503),
+                   Mock(status_code=200)]
+        send = Mock(side_effect=answers)
+        policy = RetryPolicy(timeout=2, retries=2, backoff=0)
+        self.assertIs(policy.call(send, 'http://example.com'), answers[2])
+        self.assertEqual(send.call_count, 3)
+        send.assert_called_with('http://example.com', timeout=2)
+        answers[1].close.assert_called_once()
+
+    def test_retries_exhausted(self) -> None:
+        '''test_retries_exhausted method'''
+        send = Mock(side_effect=requests.Timeout())
+        with self.assertRaises(requests.Timeout):
+            RetryPolicy(retries=1, backoff=0).call(send, 'http://x')
+        self.assertEqual(send.call_count, 2)
+        last = Mock(status_code=502)
+        send = Mock(return_value=last)
+        self.assertIs(RetryPolicy(retries=1, backoff=0).call(send, 'x'), last)
+
+    def test_hedge(self) -> None:
+        '''test_hedge method'''
+        slow, fast = Mock(status_code=200), Mock(status_code=200)
+
+        def send(url: str) -> Mock:
+            '''The first call is slow, the hedged one is fast'''
+            if send.calls == 0:
+                send.calls += 1
+                time.sleep(0.3)
+                return slow
+            return fast
+        send.calls = 0
+
+        policy = RetryPolicy(hedge_after=0.05)
+        start = time.monotonic()
+        self.assertIs(policy.call(send, 'http://example.com'), fast)
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(policy.hedged, 1)
+        time.sleep(0.3)
+        slow.close.assert_called_once()
+
+    def test_hedge_delay(self) -> None:
+        '''test_hedge_delay method'''
+        policy = RetryPolicy(hedge_after=1.0, hedge_quantile=0.9)
+        policy.latencies.extend(range(10))
+        self.assertEqual(policy.hedge_delay(), 1.0)
+        policy.latencies.extend(range(10, 100))
+        self.assertEqual(policy.hedge_delay(), 90)
+
+
+class TestDiskCache(unittest.TestCase):
+    '''Test the DiskCache class
+        Methods:
+            test_shared - test that bodies are shared through the file
+            test_ttl - test freshness and revalidation of stale bodies
+            test_max_bytes - test least recently used eviction
+    '''
+    def setUp(self) -> None:
+        '''Create a temporary cache file'''
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite')
+
+    def tearDown(self) -> None:
+        '''Stop using the cache'''
+        set_disk_cache(None)
+
+    def test_shared(self) -> None:
+        '''test_shared method'''
+        key = ('http://example.com', None)
+        DiskCache(self.path).put(key, {'payload': True}, {})
+        self.assertEqual(DiskCache(self.path).get(key),
+                         ({'payload': True}, {}, True))
+        self.assertIsNone(DiskCache(self.path).get(('other', None)))
+
+    def test_ttl(self) -> None:
+        '''test_ttl method'''
+        set_disk_cache(DiskCache(self.path, ttl=60))
+        first = Mock(status_code=200, headers={'ETag': '"v1"'})
+        first.json.return_value = {'payload': True}
+        second = Mock(status_code=304, headers={'ETag': '"v1"'})
+        with patch.object(requests, 'get',
+                          side_effect=[first, second]) as mock_method, \
+                patch('utils.time.time', return_value=1000) as clock:
+            self.assertEqual(get_json('http://example.com'),
+                             {'payload': True})
+            clock.return_value = 1059
+            self.assertEqual(get_json('http://example.com'),
+                             {'payload': True})
+            mock_method.assert_called_once_with('http://example.com')
+            clock.return_value = 1061
+            self.assertEqual(get_json('http://example.com'),
+                             {'payload': True})
+            mock_method.assert_called_with('http://example.com', headers={
+                'If-None-Match': '"v1"'})
+            clock.return_value = 1120
+            get_json('http://example.com')
+            self.assertEqual(mock_method.call_count, 2)
+
+    def test_max_bytes(self) -> None:
+        '''test_max_bytes method'''
+        cache = DiskCache(self.path, max_bytes=2500)
+        with patch('utils.time.time', return_value=0) as clock:
+            for i, url in enumerate(('a', 'b', 'c')):
+                clock.return_value = i
+                if url == 'c':
+                    cache.get(('a', None))
+                cache.put((url, None), 'x' * 1000, {})
+        self.assertIsNotNone(cache.get(('a', None)))
+        self.assertIsNone(cache.get(('b', None)))
+        self.assertIsNotNone(cache.get(('c', None)))
+
+
+class TestMetrics(unittest.TestCase):
+    '''Test the Metrics class and its hooks
+        Methods:
+            test_disabled - test that nothing is recorded by default
+            test_snapshot - test what get_json, memoize and timed record
+            test_to_prometheus - test the text exposition format
+    '''
+    def tearDown(self) -> None:
+        '''Stop recording'''
+        disable_metrics()
+
+    def record(self) -> None:
+        '''Two get_json calls, three memoized reads and a timed block'''
+        class TestClass:
+            ''' TestClass with a memoized property
+            '''
+            @memoize
+            def a_property(self) -> int:
+                ''' a_property that returns 42
+                '''
+                return 42
+
+        mock_response = Mock(headers={'Content-Length': '12'})
+        mock_response.json.return_value = {'payload': True}
+        with patch.object(requests, 'get', return_value=mock_response):
+            get_json('http://example.com/a?page=1')
+            get_json('http://example.com/a?page=2')
+        test = TestClass()
+        test.a_property, test.a_property, test.a_property
+        with timed('block'):
+            pass
+
+    def test_disabled(self) -> None:
+        '''test_disabled method'''
+        self.assertIsNone(get_metrics())
+        self.record()
+        self.assertIsNone(get_metrics())
+
+    def test_snapshot(self) -> None:
+        '''test_snapshot method'''
+        metrics = enable_metrics()
+        self.assertIs(get_metrics(), metrics)
+        self.record()
+        snapshot = metrics.snapshot()
+        request = snapshot['requests']['http://example.com/a']
+        self.assertEqual((request['count'], request['bytes']), (2, 24))
+        self.assertEqual(sum(request['buckets'].values()), 2)
+        self.assertEqual(snapshot['decode']['http://example.com/a']['count'],
+                         2)
+        self.assertEqual(list(snapshot['memoize'].values()),
+                         [{'hits': 2, 'misses': 1}])
+        self.assertEqual(snapshot['timers']['block']['count'], 1)
+
+    def test_to_prometheus(self) -> None:
+        '''test_to_prometheus method'''
+        metrics = enable_metrics()
+        self.record()
+        text = metrics.to_prometheus()
+        self.assertIn('# TYPE github_request_seconds histogram\n', text)
+        self.assertIn('github_request_seconds_bucket{url="http://example.com'
+                      '/a",le="+Inf"} 2\n', text)
+        self.assertIn('github_response_bytes_total{url="http://example.com'
+                      '/a"} 24\n', text)
+        self.assertIn('github_timer_seconds_count{name="block"} 1\n', text)
+        self.assertRegex(text, r'github_memoize_total\{name="[^"]*'
+                               r'a_property",result="hit"\} 2\n')
+
+
+class TestSession(unittest.TestCase):
+    '''Test the shared session behind get_json
+        Methods:
+            test_configure_session - test that get_json goes through the
+            configured session and back to requests.get once closed
+    '''
+    def tearDown(self) -> None:
+        '''Close the shared session'''
+        close_session()
+
+    def test_configure_session(self) -> None:
+        '''test_configure_session method'''
+        session = configure_session(pool_maxsize=4, pool_block=True,
+                                    accept_encoding='gzip')
+        self.assertIs(get_session(), session)
+        self.assertEqual(session.headers['Accept-Encoding'], 'gzip')
+        self.assertEqual(session.get_adapter('https://x')._pool_maxsize, 4)
+        mock_response = Mock()
+        mock_response.json.return_value = {'payload': True}
+        with patch.object(session, 'get',
+                          return_value=mock_response) as mock_get, \
+                patch.object(requests, 'get') as mock_requests_get:
+            self.assertEqual(get_json('http://example.com'),
+                             {'payload': True})
+            mock_get.assert_called_once_with('http://example.com')
+            mock_requests_get.assert_not_called()
+
+        close_session()
+        self.assertIsNone(get_session())
+        with patch.object(requests, 'get',
+                          return_value=mock_response) as mock_requests_get:
+            get_json('http://example.com')
+            mock_requests_get.assert_called_once_with('http://example.com')
+
+
+class TestIterJsonPages(unittest.TestCase):
+    '''Test the iter_json_pages method
+        Methods:
+            test_iter_json_pages - test that every page linked through
+            the `Link: rel="next"` header is fetched lazily, in order
+    '''
+    def test_iter_json_pages(self) -> None:
+        '''test_iter_json_pages method
+            Two pages linked by rel="next", the last one has no next link.
+        '''
+        pages = {
+            'http://example.com/repos': Mock(
+                json=Mock(return_value=[1, 2]),
+                links={'next': {'url': 'http://example.com/repos?page=2',
+                                'rel': 'next'}}),
+            'http://example.com/repos?page=2': Mock(
+                json=Mock(return_value=[3]), links={}),
+        }
+        with patch.object(requests, 'get',
+                          side_effect=pages.get) as mock_method:
+            iterator = iter_json_pages('http://example.com/repos')
+            mock_method.assert_not_called()
+            self.assertEqual(next(iterator), [1, 2])
+            mock_method.assert_called_once_with('http://example.com/repos')
+            self.assertEqual(list(iterator), [[3]])
+            self.assertEqual(mock_method.call_count, 2)
+
+
 class TestMemoize(unittest.TestCase):
     ''' Test the memoize method
         Methods:
@@ -123,3 +665,125 @@ class TestMemoize(unittest.TestCase):
             self.assertEqual(out1, 42)
             self.assertEqual(out2, 42)
             mock_method.assert_called_once()
+
+    def test_memoize_ttl(self) -> None:
+        '''
+            Values older than the ttl are computed again
+        '''
+        class TestClass:
+            ''' TestClass with a property memoized for 10 seconds
+            '''
+            calls = 0
+
+            @memoize(ttl=10)
+            def a_property(self) -> int:
+                ''' a_property that counts its calls
+                '''
+                self.calls += 1
+                return self.calls
+
+        test = TestClass()
+        with patch('utils.time.monotonic', return_value=0) as clock:
+            self.assertEqual(test.a_property, 1)
+            clock.return_value = 5
+            self.assertEqual(test.a_property, 1)
+            clock.return_value = 11
+            self.assertEqual(test.a_property, 2)
+
+    def test_invalidate(self) -> None:
+        '''
+            invalidate drops the named or every memoized value
+        '''
+        class TestClass:
+            ''' TestClass with two memoized properties
+            '''
+            calls = 0
+
+            @memoize
+            def a_property(self) -> int:
+                ''' a_property that counts its calls
+                '''
+                self.calls += 1
+                return self.calls
+
+            @memoize
+            def b_property(self) -> int:
+                ''' b_property reading a_property
+                '''
+                return self.a_property * 10
+
+        test = TestClass()
+        self.assertEqual(test.b_property, 10)
+        invalidate(test, 'a_property')
+        self.assertEqual((test.a_property, test.b_property), (2, 10))
+        invalidate(test)
+        self.assertEqual(test.b_property, 30)
+
+    def test_memoize_limit(self) -> None:
+        '''
+            Least recently used values are dropped past the byte limit
+        '''
+        class TestClass:
+            ''' TestClass with a memoized 1 kB string
+            '''
+            calls = 0
+
+            @memoize
+            def a_property(self) -> str:
+                ''' a_property that counts its calls
+                '''
+                TestClass.calls += 1
+                return 'x' * 1000
+
+        set_memoize_limit(2500)
+        self.addCleanup(set_memoize_limit, None)
+        first, second, third = TestClass(), TestClass(), TestClass()
+        first.a_property
+        second.a_property
+        first.a_property
+        third.a_property
+        self.assertEqual(TestClass.calls, 3)
+        self.assertTrue(hasattr(first, '_a_property'))
+        self.assertFalse(hasattr(second, '_a_property'))
+        self.assertTrue(hasattr(third, '_a_property'))
+
+        self.assertGreater(utils._memo_bytes, 2000)
+        with utils._memo_lock:
+            reader = threading.Thread(target=lambda: third.a_property)
+            reader.start()
+            reader.join(1)
+            self.assertFalse(reader.is_alive())
+        del first, third
+        self.assertEqual(len(utils._memo_lru), 0)
+        self.assertEqual(utils._memo_bytes, 0)
+
+
+class TestAsyncMemoize(unittest.IsolatedAsyncioTestCase):
+    ''' Test the async_memoize method
+        Methods:
+            test_async_memoize - test that concurrent awaiters share one
+            call and that a failed call is retried on next access
+    '''
+    async def test_async_memoize(self) -> None:
+        '''test_async_memoize method'''
+        class TestClass:
+            ''' TestClass with an awaitable memoized property
+            '''
+            calls = 0
+
+            @async_memoize
+            async def a_property(self) -> int:
+                ''' a_property failing on its first call
+                '''
+                self.calls += 1
+                await asyncio.sleep(0)
+                if self.calls == 1:
+                    raise ValueError('first call')
+                return 42
+
+        test = TestClass()
+        with self.assertRaises(ValueError):
+            await test.a_property
+        results = await asyncio.gather(test.a_property, test.a_property)
+        self.assertEqual(results, [42, 42])
+        self.assertEqual(test.calls, 2)
@@ -1,7 +1,27 @@
 #!/usr/bin/env python3
 """Generic utilities for github org client.
 """
+import asyncio
+import codecs
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import weakref
 import requests
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from requests.adapters import HTTPAdapter
 from functools import wraps
 from typing import (
     Mapping,
@@ -9,14 +29,85 @@ from typing import (
     Any,
     Dict,
     Callable,
+    Awaitable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 __all__ = [
+    "DiskCache",
+    "Metrics",
     "access_nested_map",
+    "access_nested_maps",
+    "async_get_json",
+    "async_memoize",
+    "clear_validators",
+    "close_session",
+    "compile_path",
+    "configure_session",
+    "disable_metrics",
+    "enable_conditional_requests",
+    "enable_metrics",
+    "get_disk_cache",
     "get_json",
+    "get_json_decoder",
+    "get_metrics",
+    "get_rate_limiter",
+    "get_retry_policy",
+    "get_session",
+    "invalidate",
+    "iter_json_array",
+    "iter_json_pages",
     "memoize",
+    "project",
+    "RateLimiter",
+    "RetryPolicy",
+    "set_disk_cache",
+    "set_json_decoder",
+    "set_memoize_limit",
+    "set_rate_limiter",
+    "set_retry_policy",
+    "set_validators_limit",
+    "timed",
 ]
 
+_session: Optional[requests.Session] = None
+_async_workers = 10
+_async_executor: Optional[ThreadPoolExecutor] = None
+_rate_limiter: Optional["RateLimiter"] = None
+_THROTTLED_RETRIES = 3
+_retry_policy: Optional["RetryPolicy"] = None
+_conditional = False
+_validators: "OrderedDict[Tuple[str, Optional[Tuple]], " \
+    "Tuple[Dict[str, str], Any]]" = OrderedDict()
+_validators_limit: Optional[int] = 1024
+_validators_lock = threading.Lock()
+_disk_cache: Optional["DiskCache"] = None
+_metrics: Optional["Metrics"] = None
+_NOT_TIMED = nullcontext()
+_decoder = json.JSONDecoder()
+_json_decoder: Optional[str] = None
+_loads: Optional[Callable[[Union[bytes, str]], Any]] = None
+_WHITESPACE = " \t\n\r"
+Fields = Sequence[Union[str, Sequence]]
+_memo_limit: Optional[int] = None
+_memo_bytes = 0
+_memo_lru: "OrderedDict[Tuple[int, str], Tuple[weakref.ref, int]]" = \
+    OrderedDict()
+_memo_lock = threading.Lock()
+_memo_dead: "deque[Tuple[Tuple[int, str], weakref.ref]]" = deque()
+_SIZEOF_SAMPLE = 32
+_MISSING = object()
+
 
 def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     """Access nested map with key path.
@@ -40,15 +131,1025 @@ def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     return nested_map
 
 
-def get_json(url: str) -> Dict:
+def compile_path(path: Sequence) -> Callable[[Mapping], Any]:
+    """Precompile access_nested_map for one key path.
+    The returned getter raises KeyError exactly like access_nested_map
+    but skips re-reading the path and the Mapping check on plain dicts.
+    Example
+    -------
+    >>> license_key = compile_path(("license", "key"))
+    >>> license_key({"license": {"key": "mit"}})
+    'mit'
+    """
+    keys = tuple(path)
+
+    if len(keys) == 1:
+        key0, = keys
+
+        def getter(nested_map: Mapping) -> Any:
+            """Compiled one-key access"""
+            if type(nested_map) is not dict \
+                    and not isinstance(nested_map, Mapping):
+                raise KeyError(key0)
+            return nested_map[key0]
+    elif len(keys) == 2:
+        key0, key1 = keys
+
+        def getter(nested_map: Mapping) -> Any:
+            """Compiled two-key access"""
+            if type(nested_map) is not dict \
+                    and not isinstance(nested_map, Mapping):
+                raise KeyError(key0)
+            nested_map = nested_map[key0]
+            if type(nested_map) is not dict \
+                    and not isinstance(nested_map, Mapping):
+                raise KeyError(key1)
+            return nested_map[key1]
+    else:
+        def getter(nested_map: Mapping) -> Any:
+            """Compiled access"""
+            for key in keys:
+                if type(nested_map) is not dict \
+                        and not isinstance(nested_map, Mapping):
+                    raise KeyError(key)
+                nested_map = nested_map[key]
+            return nested_map
+
+    getter.path = keys
+    return getter
+
+
+def access_nested_maps(nested_maps: Iterable[Mapping], path: Sequence,
+                       default: Any = _MISSING) -> List[Any]:
+    """Access the same key path in every map of `nested_maps`.
+    Maps missing the path raise KeyError, or give `default` when set.
+    Example
+    -------
+    >>> repos = [{"license": {"key": "mit"}}, {"license": None}]
+    >>> access_nested_maps(repos, ("license", "key"), None)
+    ['mit', None]
+    """
+    getter = compile_path(path)
+    if default is _MISSING:
+        return [getter(nested_map) for nested_map in nested_maps]
+
+    values = []
+    append = values.append
+    for nested_map in nested_maps:
+        try:
+            append(getter(nested_map))
+        except KeyError:
+            append(default)
+    return values
+
+
+def project(value: Any, fields: Fields) -> Any:
+    """Keep only `fields` of a map, or of every map of a list.
+    Each field is a key or a key path; a path stops early, keeping the
+    value as is, where it meets something that is not a Mapping.
+    Example
+    -------
+    >>> project({"name": "a", "id": 1, "license": {"key": "mit"}},
+    ...         ["name", ("license", "key")])
+    {'name': 'a', 'license': {'key': 'mit'}}
+    """
+    paths = _field_paths(fields)
+    if isinstance(value, list):
+        return [_project(item, paths) for item in value]
+    return _project(value, paths)
+
+
+def _field_paths(fields: Fields) -> Tuple[Tuple, ...]:
+    """Normalize fields to a hashable tuple of key paths"""
+    return tuple((field,) if isinstance(field, str) else tuple(field)
+                 for field in fields)
+
+
+def _project(nested_map: Any, paths: Tuple[Tuple, ...]) -> Any:
+    """project one map on already normalized paths"""
+    if not isinstance(nested_map, Mapping):
+        return nested_map
+    projected: Dict = {}
+    for path in paths:
+        source, target = nested_map, projected
+        for depth, key in enumerate(path, 1):
+            if key not in source \
+                    or (key in target and target[key] is source[key]):
+                break
+            source = source[key]
+            if depth == len(path) or not isinstance(source, Mapping):
+                target[key] = source
+                break
+            target = target.setdefault(key, {})
+    return projected
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Decode the items of a JSON array from text chunks, one by one.
+    Only the item being decoded is buffered, never the whole array.
+    Example
+    -------
+    >>> list(iter_json_array(['[{"a": 1}, {"a"', ': 2}]']))
+    [{'a': 1}, {'a': 2}]
+    """
+    buffer, pos = "", 0
+    state = "start"
+    for chunk in chunks:
+        buffer, pos = buffer[pos:] + chunk, 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("expected a JSON array")
+                state, pos = "first", pos + 1
+            elif state in ("first", "next") and char == "]":
+                return
+            elif state == "next":
+                if char != ",":
+                    raise ValueError(
+                        "expected ',' or ']' at offset {}".format(pos))
+                state, pos = "item", pos + 1
+            else:
+                try:
+                    item, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break
+                if end == len(buffer):
+                    # a number cut by the chunk boundary decodes too
+                    break
+                yield item
+                state, pos = "next", end
+    raise ValueError("truncated JSON array")
+
+
+def _decode_projected(response: requests.Response, fields: Fields) -> Any:
+    """Stream-decode a response body keeping only `fields`"""
+    paths = _field_paths(fields)
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    chunks = (decoder.decode(chunk) for chunk in
+              response.iter_content(chunk_size=64 * 1024))
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    if not head.lstrip().startswith("["):
+        text = head + "".join(chunks) + decoder.decode(b"", final=True)
+        return _project(json.loads(text), paths)
+
+    def rest() -> Iterator[str]:
+        """The already read head then the remaining chunks"""
+        yield head
+        yield from chunks
+        yield decoder.decode(b"", final=True)
+
+    return [_project(item, paths) for item in iter_json_array(rest())]
+
+
+def configure_session(pool_connections: int = 10, pool_maxsize: int = 10,
+                      pool_block: bool = False,
+                      accept_encoding: str =
+                      requests.utils.DEFAULT_ACCEPT_ENCODING
+                      ) -> requests.Session:
+    """Share one pooled keep-alive session between every request.
+    Parameters
+    ----------
+    pool_connections: int
+        number of hosts whose connection pools are kept around
+    pool_maxsize: int
+        maximum number of connections kept alive per host
+    pool_block: bool
+        block instead of opening extra connections once a host
+        has `pool_maxsize` connections in use
+    accept_encoding: str
+        Accept-Encoding of every request, by default every compression
+        urllib3 can decode here ("identity" asks for none)
+    Example
+    -------
+    >>> session = configure_session(pool_maxsize=32)
+    >>> get_session() is session
+    True
+    """
+    global _session, _async_workers
+    close_session()
+    _async_workers = pool_maxsize
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = accept_encoding
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          pool_block=pool_block)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    _session = session
+    return session
+
+
+def get_session() -> Optional[requests.Session]:
+    """Return the shared session, None when it is not configured.
+    """
+    return _session
+
+
+def close_session() -> None:
+    """Close the shared session and go back to one-off requests.
+    """
+    global _session, _async_executor
+    if _session is not None:
+        _session.close()
+        _session = None
+    if _async_executor is not None:
+        _async_executor.shutdown(wait=False)
+        _async_executor = None
+
+
+class Metrics:
+    """Counters and histograms of where get_json & co spend time.
+    Request latencies and bytes are kept per URL (without its query),
+    memoize hits/misses per property and `timed` blocks per name.
+    Example
+    -------
+    >>> metrics = enable_metrics()
+    >>> GithubOrgClient("google").public_repos()
+    >>> metrics.snapshot()["requests"]["https://api.github.com/orgs/google"]
+    {'count': 1, 'seconds': 0.12, 'bytes': 1234, 'buckets': {...}}
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+               10.0)
+
+    def __init__(self) -> None:
+        """Init method of Metrics"""
+        self._lock = threading.Lock()
+        self._requests: Dict[str, List] = {}
+        self._decodes: Dict[str, List[float]] = {}
+        self._memoize: Dict[str, List[int]] = {}
+        self._timers: Dict[str, List[float]] = {}
+
+    def observe_response(self, url: str, seconds: float,
+                         response: requests.Response, stream: bool) -> None:
+        """Record one HTTP exchange"""
+        length = response.headers.get("Content-Length")
+        if length is not None:
+            size = int(length)
+        else:
+            size = 0 if stream else len(response.content)
+        url = url.split("?", 1)[0]
+        bucket = next((i for i, bound in enumerate(self.BUCKETS)
+                       if seconds <= bound), len(self.BUCKETS))
+        with self._lock:
+            entry = self._requests.get(url)
+            if entry is None:
+                entry = self._requests[url] = [
+                    0, 0.0, 0, [0] * (len(self.BUCKETS) + 1)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += size
+            entry[3][bucket] += 1
+
+    def observe_decode(self, url: str, seconds: float) -> None:
+        """Record the time spent decoding one body"""
+        url = url.split("?", 1)[0]
+        with self._lock:
+            entry = self._decodes.setdefault(url, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def observe_memoize(self, name: str, hit: bool) -> None:
+        """Record one memoized property access"""
+        with self._lock:
+            self._memoize.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+    def observe_time(self, name: str, seconds: float) -> None:
+        """Record one `timed` block"""
+        with self._lock:
+            entry = self._timers.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of every metric as plain dicts"""
+        labels = [str(bound) for bound in self.BUCKETS] + ["+Inf"]
+        with self._lock:
+            return {
+                "requests": {
+                    url: {"count": count, "seconds": seconds,
+                          "bytes": size,
+                          "buckets": dict(zip(labels, buckets))}
+                    for url, (count, seconds, size, buckets)
+                    in self._requests.items()},
+                "decode": {url: {"count": count, "seconds": seconds}
+                           for url, (count, seconds)
+                           in self._decodes.items()},
+                "memoize": {name: {"hits": hits, "misses": misses}
+                            for name, (hits, misses)
+                            in self._memoize.items()},
+                "timers": {name: {"count": count, "seconds": seconds}
+                           for name, (count, seconds)
+                           in self._timers.items()},
+            }
+
+    def to_prometheus(self, prefix: str = "github") -> str:
+        """Every metric in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = ["# TYPE {}_request_seconds histogram".format(prefix)]
+        for url, entry in snapshot["requests"].items():
+            label = 'url="{}"'.format(_escape_label(url))
+            total = 0
+            for bound, count in entry["buckets"].items():
+                total += count
+                lines.append('{}_request_seconds_bucket{{{},le="{}"}} {}'
+                             .format(prefix, label, bound, total))
+            lines.append("{}_request_seconds_sum{{{}}} {}".format(
+                prefix, label, entry["seconds"]))
+            lines.append("{}_request_seconds_count{{{}}} {}".format(
+                prefix, label, entry["count"]))
+        lines.append("# TYPE {}_response_bytes_total counter".format(prefix))
+        for url, entry in snapshot["requests"].items():
+            lines.append('{}_response_bytes_total{{url="{}"}} {}'.format(
+                prefix, _escape_label(url), entry["bytes"]))
+        for name, key, label in (("decode_seconds", "decode", "url"),
+                                 ("timer_seconds", "timers", "name")):
+            lines.append("# TYPE {}_{} summary".format(prefix, name))
+            for value, entry in snapshot[key].items():
+                for suffix, field in (("sum", "seconds"), ("count", "count")):
+                    lines.append('{}_{}_{}{{{}="{}"}} {}'.format(
+                        prefix, name, suffix, label, _escape_label(value),
+                        entry[field]))
+        lines.append("# TYPE {}_memoize_total counter".format(prefix))
+        for name, entry in snapshot["memoize"].items():
+            for field, result in (("hits", "hit"), ("misses", "miss")):
+                lines.append('{}_memoize_total{{name="{}",result="{}"}} {}'
+                             .format(prefix, _escape_label(name), result,
+                                     entry[field]))
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"') \
+        .replace("\n", "\\n")
+
+
+class _Timer:
+    """Context manager recording its duration in Metrics"""
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: Metrics, name: str) -> None:
+        """Init method of _Timer"""
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> "_Timer":
+        """Start timing"""
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Record the duration"""
+        self.metrics.observe_time(self.name, time.perf_counter() - self.start)
+
+
+def enable_metrics() -> Metrics:
+    """Start recording metrics, in a new Metrics returned.
+    """
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def disable_metrics() -> None:
+    """Stop recording metrics.
+    """
+    global _metrics
+    _metrics = None
+
+
+def get_metrics() -> Optional[Metrics]:
+    """Return the Metrics being recorded, None when disabled.
+    """
+    return _metrics
+
+
+def timed(name: str) -> Any:
+    """Context manager timing its block as `name` when metrics are on.
+    Example
+    -------
+    >>> with timed("public_repos_filter"):
+    ...     names = [repo["name"] for repo in repos]
+    """
+    if _metrics is None:
+        return _NOT_TIMED
+    return _Timer(_metrics, name)
+
+
+class RateLimiter:
+    """Token bucket pacing requests to what the API allows.
+    Requests are spaced at `rate` per second (bursts of `burst`), slowed
+    further to spread the X-RateLimit-Remaining quota until
+    X-RateLimit-Reset, and held back entirely after a Retry-After or
+    once the quota is spent. Safe to share between threads.
+    Example
+    -------
+    >>> set_rate_limiter(RateLimiter(rate=10))
+    >>> get_json("https://api.github.com/orgs/google")
+    >>> get_rate_limiter().remaining
+    59
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 1) -> None:
+        """Allow `rate` requests per second, `burst` at once"""
+        self.rate = rate
+        self.burst = burst
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _current_rate(self) -> float:
+        """Configured rate, lowered to spread the quota left until reset"""
+        if self.remaining is None or self.reset is None:
+            return self.rate
+        seconds = self.reset - time.time()
+        if seconds <= 0:
+            return self.rate
+        return min(self.rate, max(self.remaining, 0) / seconds)
+
+    def delay(self) -> float:
+        """Take a token now and return 0, or return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self.remaining is not None and self.remaining <= 0:
+                if self.reset is None or self.reset <= time.time():
+                    self.remaining = None
+                else:
+                    return self.reset - time.time()
+            rate = self._current_rate()
+            self._tokens = min(self.burst, self._tokens
+                               + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / rate if rate > 0 else 1.0
+            self._tokens -= 1
+            if self.remaining is not None:
+                self.remaining -= 1
+            return 0.0
+
+    def acquire(self) -> None:
+        """Block until the next request may be sent"""
+        wait = self.delay()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.delay()
+
+    def update(self, response: requests.Response) -> bool:
+        """Learn the quota from a response's headers.
+        Returns whether the response was throttled and worth retrying.
+        """
+        headers = response.headers
+        throttled = response.status_code in (403, 429) and (
+            "Retry-After" in headers
+            or headers.get("X-RateLimit-Remaining") == "0")
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                remaining = int(headers["X-RateLimit-Remaining"])
+                reset = float(headers.get("X-RateLimit-Reset", 0)) or None
+                if reset is not None and reset == self.reset \
+                        and self.remaining is not None:
+                    # answers of one window may arrive out of order
+                    remaining = min(remaining, self.remaining)
+                self.remaining, self.reset = remaining, reset
+            retry_after = _retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until,
+                                          time.monotonic() + retry_after)
+        return throttled
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in seconds or as an
+    HTTP date; None when absent or unparsable"""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(),
+                   0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    """Pace every request through `limiter`, None to stop pacing.
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Return the shared RateLimiter, None when requests are not paced.
+    """
+    return _rate_limiter
+
+
+class RetryPolicy:
+    """Timeouts, retries and hedging for the (idempotent) GETs.
+    Parameters
+    ----------
+    timeout: Optional[float]
+        seconds to connect and between received bytes, None waits forever
+    retries: int
+        extra attempts after a connection error, timeout or 5xx answer
+    backoff: float
+        seconds before the first retry, doubled at each retry up to
+        `max_backoff`, with full jitter
+    hedge_after: Optional[float]
+        seconds after which a second, identical request is sent if the
+        first has not answered; whichever answers first is used
+    hedge_quantile: Optional[float]
+        hedge at this quantile (e.g. 0.95) of the latest latencies
+        instead, once enough of them are known
+    Example
+    -------
+    >>> set_retry_policy(RetryPolicy(timeout=5, retries=3,
+    ...                              hedge_quantile=0.95))
+    """
+    RETRY_STATUSES = frozenset((500, 502, 503, 504))
+    RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, timeout: Optional[float] = None, retries: int = 0,
+                 backoff: float = 0.1, max_backoff: float = 5.0,
+                 hedge_after: Optional[float] = None,
+                 hedge_quantile: Optional[float] = None,
+                 window: int = 200) -> None:
+        """Init method of RetryPolicy"""
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.hedge_quantile = hedge_quantile
+        self.latencies: "deque[float]" = deque(maxlen=window)
+        self.hedged = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None not to hedge"""
+        if self.hedge_quantile is not None and len(self.latencies) >= 20:
+            latencies = sorted(self.latencies)
+            return latencies[min(len(latencies) - 1,
+                                 int(len(latencies) * self.hedge_quantile))]
+        return self.hedge_after
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Jittered exponential delay before retry number `attempt`"""
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, send: Callable[..., requests.Response], url: str,
+             **kwargs: Any) -> requests.Response:
+        """`send(url, **kwargs)` under the timeout, retry and hedging"""
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = self._hedged(send, url, kwargs)
+            except self.RETRY_ERRORS:
+                if last:
+                    raise
+            else:
+                if last or response.status_code not in self.RETRY_STATUSES:
+                    return response
+                response.close()
+            time.sleep(self.backoff_delay(attempt))
+
+    def _timed(self, send: Callable[..., requests.Response], url: str,
+               kwargs: Dict[str, Any]) -> requests.Response:
+        """send and record the latency"""
+        start = time.monotonic()
+        response = send(url, **kwargs)
+        self.latencies.append(time.monotonic() - start)
+        return response
+
+    def _hedged(self, send: Callable[..., requests.Response], url: str,
+                kwargs: Dict[str, Any]) -> requests.Response:
+        """send, and send again if the first answer is too slow"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(send, url, kwargs)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(thread_name_prefix="hedge")
+        futures = [self._pool.submit(self._timed, send, url, kwargs)]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            self.hedged += 1
+            futures.append(self._pool.submit(self._timed, send, url, kwargs))
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None or not pending:
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+
+
+def _close_response(future: Future) -> None:
+    """Release the connection of a response nobody will read"""
+    if future.exception() is None:
+        future.result().close()
+
+
+def set_retry_policy(policy: Optional[RetryPolicy]) -> None:
+    """Send every request under `policy`, None for a single attempt.
+    """
+    global _retry_policy
+    _retry_policy = policy
+
+
+def get_retry_policy() -> Optional[RetryPolicy]:
+    """Return the shared RetryPolicy, None when it is not set.
+    """
+    return _retry_policy
+
+
+def _request(url: str, **kwargs: Any) -> requests.Response:
+    """GET `url` through the shared session when one is configured.
+    Requests follow the shared RetryPolicy when one is set.
+    """
+    if _retry_policy is None:
+        return _send(url, **kwargs)
+    return _retry_policy.call(_send, url, **kwargs)
+
+
+def _send(url: str, **kwargs: Any) -> requests.Response:
+    """Send one GET, paced by the shared RateLimiter when one is set.
+    Throttled answers are retried once the limiter allows.
+    """
+    get = requests.get if _session is None else _session.get
+    limiter = _rate_limiter
+    for _ in range(_THROTTLED_RETRIES):
+        if limiter is not None:
+            limiter.acquire()
+        metrics = _metrics
+        if metrics is None:
+            response = get(url, **kwargs)
+        else:
+            start = time.perf_counter()
+            response = get(url, **kwargs)
+            metrics.observe_response(url, time.perf_counter() - start,
+                                     response, kwargs.get("stream", False))
+        if limiter is None or not limiter.update(response):
+            break
+    return response
+
+
+def enable_conditional_requests(enabled: bool = True) -> None:
+    """Make get_json send conditional requests by default.
+    The ETag/Last-Modified of every response is remembered with its
+    body; the next request for the same URL carries If-None-Match/
+    If-Modified-Since and a 304 answer is served from that body.
+    """
+    global _conditional
+    _conditional = enabled
+
+
+def clear_validators() -> None:
+    """Forget every remembered validator and body.
+    """
+    with _validators_lock:
+        _validators.clear()
+
+
+def set_validators_limit(max_entries: Optional[int]) -> None:
+    """Bound how many URLs have their validators and body remembered.
+    The least recently used are forgotten first once the bound is
+    exceeded. Defaults to 1024; None lifts the bound.
+    """
+    global _validators_limit
+    with _validators_lock:
+        _validators_limit = max_entries
+        _trim_validators()
+
+
+class DiskCache:
+    """On-disk JSON body cache shared by every process using `path`.
+    Bodies are stored in sqlite (WAL mode) with their ETag/Last-Modified,
+    answered without any request while younger than `ttl` seconds and
+    revalidated with a conditional request afterwards. Least recently
+    used bodies are dropped once they take more than `max_bytes`.
+    Example
+    -------
+    >>> set_disk_cache(DiskCache("~/.cache/github.sqlite", ttl=600))
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bodies (
+            key TEXT PRIMARY KEY,
+            fetched_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            size INTEGER NOT NULL,
+            validators TEXT NOT NULL,
+            body TEXT NOT NULL
+        )"""
+
+    def __init__(self, path: str, ttl: float = 300,
+                 max_bytes: int = 256 * 2 ** 20) -> None:
+        """Open, or create, the cache at `path`"""
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection to the cache"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _key(key: Tuple[str, Optional[Tuple]]) -> str:
+        """Text form of a get_json cache key"""
+        url, fields = key
+        return url if fields is None else "{} {}".format(
+            url, json.dumps(fields))
+
+    def get(self, key: Tuple[str, Optional[Tuple]]
+            ) -> Optional[Tuple[Any, Dict[str, str], bool]]:
+        """Body, validators and freshness of `key`, None when absent"""
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT body, validators, fetched_at FROM bodies "
+                "WHERE key = ?", (self._key(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE bodies SET used_at = ? WHERE key = ?",
+                               (now, self._key(key)))
+        fresh = now - row[2] < self.ttl
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return (_loads or json.loads)(row[0]), json.loads(row[1]), fresh
+
+    def put(self, key: Tuple[str, Optional[Tuple]], body: Any,
+            validators: Dict[str, str]) -> None:
+        """Store a freshly fetched body then evict down to max_bytes"""
+        text = json.dumps(body, separators=(",", ":"))
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO bodies (key, fetched_at, used_at,"
+                " size, validators, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(key), now, now, len(text), json.dumps(validators),
+                 text))
+            total = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(connection, total - self.max_bytes)
+
+    @staticmethod
+    def _evict(connection: sqlite3.Connection, excess: int) -> None:
+        """Delete least recently used bodies worth `excess` bytes"""
+        keys = []
+        for key, size in connection.execute(
+                "SELECT key, size FROM bodies ORDER BY used_at"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM bodies WHERE key = ?", keys)
+
+    def touch(self, key: Tuple[str, Optional[Tuple]]) -> None:
+        """Mark `key` as fetched now, after a 304"""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE bodies SET fetched_at = ?, used_at = ? WHERE key = ?",
+                (now, now, self._key(key)))
+
+    def clear(self) -> None:
+        """Drop every body"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM bodies")
+
+
+def set_disk_cache(cache: Optional[DiskCache]) -> None:
+    """Serve get_json from `cache` first, None to stop.
+    """
+    global _disk_cache
+    _disk_cache = cache
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """Return the shared DiskCache, None when it is not set.
+    """
+    return _disk_cache
+
+
+def get_json(url: str, conditional: Optional[bool] = None,
+             fields: Optional[Fields] = None) -> Dict:
     """Get JSON from remote URL.
+    Parameters
+    ----------
+    url: str
+        the URL to GET
+    conditional: Optional[bool]
+        revalidate a previous body with ETag/Last-Modified,
+        defaults to what enable_conditional_requests set.
+        The same object is returned on 304, do not mutate it.
+    fields: Optional[Fields]
+        stream-decode the body keeping only these keys or key paths
+        (see `project`), of every item when the body is an array
     """
-    response = requests.get(url)
-    return response.json()
+    if conditional is None:
+        conditional = _conditional
+    kwargs: Dict[str, Any] = {}
+    key = (url, None if fields is None else _field_paths(fields))
+    cached = _recall_validators(key) if conditional else None
+    disk_cache = _disk_cache
+    if disk_cache is not None:
+        entry = disk_cache.get(key)
+        if entry is not None:
+            if entry[2]:
+                return entry[0]
+            if cached is None and entry[1]:
+                cached = entry[1], entry[0]
+    if cached is not None:
+        kwargs["headers"] = cached[0]
+    if fields is not None:
+        kwargs["stream"] = True
+    response = _request(url, **kwargs)
+
+    if cached is not None and response.status_code == 304:
+        if fields is not None:
+            response.close()
+        if disk_cache is not None:
+            disk_cache.touch(key)
+        return cached[1]
+    body = _decode(url, response, fields)
+
+    if conditional:
+        _remember_validators(key, response, body)
+    if disk_cache is not None and response.status_code == 200:
+        disk_cache.put(key, body, _validators_of(response))
+    return body
 
 
-def memoize(fn: Callable) -> Callable:
+def _decode(url: str, response: requests.Response,
+            fields: Optional[Fields]) -> Any:
+    """Decode a response body, stream-decoded on `fields` when set"""
+    metrics = _metrics
+    start = 0.0 if metrics is None else time.perf_counter()
+    try:
+        if fields is None:
+            loads = _loads
+            if loads is None:
+                return response.json()
+            return loads(response.content)
+        try:
+            return _decode_projected(response, fields)
+        finally:
+            response.close()
+    finally:
+        if metrics is not None:
+            metrics.observe_decode(url, time.perf_counter() - start)
+
+
+def set_json_decoder(decoder: Optional[str] = "auto") -> None:
+    """Parse whole get_json bodies with `decoder`, not response.json().
+    "json" is the stdlib's parser and "orjson" orjson's, both reading
+    the (decompressed) body bytes as they are. "auto" picks orjson when
+    it is installed, "json" otherwise. None goes back to response.json().
+    Stream-decoded bodies (get_json's `fields`) are not affected.
+    """
+    global _json_decoder, _loads
+    if decoder == "auto":
+        decoder = "json" if orjson is None else "orjson"
+    if decoder is None:
+        loads = None
+    elif decoder == "json":
+        loads = json.loads
+    elif decoder == "orjson":
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        loads = orjson.loads
+    else:
+        raise ValueError("unknown JSON decoder: {!r}".format(decoder))
+    _json_decoder, _loads = decoder, loads
+
+
+def get_json_decoder() -> Optional[str]:
+    """Return the get_json decoder, None when it is response.json().
+    """
+    return _json_decoder
+
+
+def _validators_of(response: requests.Response) -> Dict[str, str]:
+    """Conditional request headers revalidating `response`"""
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["If-None-Match"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["If-Modified-Since"] = response.headers["Last-Modified"]
+    return validators
+
+
+def _recall_validators(key: Tuple[str, Optional[Tuple]]
+                       ) -> Optional[Tuple[Dict[str, str], Any]]:
+    """The remembered validators and body of `key`, now the most
+    recently used, or None"""
+    with _validators_lock:
+        cached = _validators.get(key)
+        if cached is not None:
+            _validators.move_to_end(key)
+    return cached
+
+
+def _remember_validators(key: Tuple[str, Optional[Tuple]],
+                         response: requests.Response, body: Any) -> None:
+    """Keep the ETag/Last-Modified of `response` along with its body"""
+    validators = _validators_of(response)
+    with _validators_lock:
+        if validators:
+            _validators[key] = (validators, body)
+            _validators.move_to_end(key)
+            _trim_validators()
+        else:
+            _validators.pop(key, None)
+
+
+def _trim_validators() -> None:
+    """Forget the least recently used validators past the limit; hold
+    _validators_lock"""
+    if _validators_limit is not None:
+        while len(_validators) > _validators_limit:
+            _validators.popitem(last=False)
+
+
+async def async_get_json(url: str) -> Dict:
+    """Get JSON from remote URL without blocking the event loop.
+    The request runs through get_json (and the shared session when
+    configured) on a thread pool as large as the session's pool.
+    """
+    global _async_executor
+    if _async_executor is None:
+        _async_executor = ThreadPoolExecutor(
+            max_workers=_async_workers, thread_name_prefix="async_get_json")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_async_executor, get_json, url)
+
+
+def iter_json_pages(url: str, fields: Optional[Fields] = None
+                    ) -> Iterator[Any]:
+    """Yield the JSON body of each page of a paginated resource.
+    Pages are followed through the ``Link: <...>; rel="next"`` header,
+    and only one page is requested (and held) at a time. `fields`
+    stream-decodes each page like get_json does.
+    Example
+    -------
+    >>> for page in iter_json_pages("https://api.github.com/orgs/x/repos"):
+    ...     print(len(page))
+    """
+    next_url: Optional[str] = url
+    while next_url:
+        if fields is None:
+            response = _request(next_url)
+        else:
+            response = _request(next_url, stream=True)
+        yield _decode(next_url, response, fields)
+        next_url = response.links.get("next", {}).get("url")
+
+
+def memoize(fn: Optional[Callable] = None, *,
+            ttl: Union[None, float, Callable[[Any], Optional[float]]] = None
+            ) -> Callable:
     """Decorator to memoize a method.
+    Concurrent first accesses from several threads run the method once.
+    Parameters
+    ----------
+    ttl: float or Callable
+        seconds after which the value is computed again, or a function
+        of the instance returning them. None caches forever.
     Example
     -------
     class MyClass:
@@ -62,14 +1163,236 @@ def memoize(fn: Callable) -> Callable:
     42
     >>> my_object.a_method
     42
+    >>> invalidate(my_object)
+    >>> my_object.a_method
+    a_method called
+    42
+    """
+    if fn is None:
+        return lambda fn: memoize(fn, ttl=ttl)
+    attr_name = "_{}".format(fn.__name__)
+    expires_name = "{}_expires".format(attr_name)
+
+    lock_name = "{}_lock".format(attr_name)
+
+    def cached(self: Any) -> Any:
+        """The memoized value, _MISSING when absent or expired"""
+        value = getattr(self, attr_name, _MISSING)
+        if value is not _MISSING and ttl is not None:
+            expires = getattr(self, expires_name, None)
+            if expires is not None and expires <= time.monotonic():
+                return _MISSING
+        return value
+
+    @wraps(fn)
+    def memoized(self):
+        """"memoized wraps"""
+        value = cached(self)
+        metrics = _metrics
+        if value is not _MISSING:
+            if _memo_limit is not None:
+                _memo_touch(self, attr_name)
+            if metrics is not None:
+                metrics.observe_memoize(fn.__qualname__, True)
+            return value
+        if metrics is not None:
+            metrics.observe_memoize(fn.__qualname__, False)
+
+        # single flight: one caller computes, concurrent callers wait
+        # on the same lock and then read what it stored
+        with vars(self).setdefault(lock_name, threading.Lock()):
+            value = cached(self)
+            if value is not _MISSING:
+                return value
+            value = fn(self)
+            setattr(self, attr_name, value)
+            seconds = ttl(self) if callable(ttl) else ttl
+            if seconds is not None:
+                setattr(self, expires_name, time.monotonic() + seconds)
+            elif hasattr(self, expires_name):
+                delattr(self, expires_name)
+        if _memo_limit is not None:
+            _memo_track(self, attr_name, value)
+        return value
+
+    memoized.memo_attr = attr_name
+    return property(memoized)
+
+
+def async_memoize(fn: Callable[[Any], Awaitable]) -> Callable:
+    """Decorator to memoize a coroutine method as an awaitable property.
+    The first access schedules one task that every awaiter shares; a
+    task that failed or was cancelled is scheduled again on next access.
+    Example
+    -------
+    class MyClass:
+        @async_memoize
+        async def a_method(self):
+            print("a_method called")
+            return 42
+    >>> my_object = MyClass()
+    >>> await my_object.a_method
+    a_method called
+    42
+    >>> await my_object.a_method
+    42
     """
     attr_name = "_{}".format(fn.__name__)
 
     @wraps(fn)
     def memoized(self):
         """"memoized wraps"""
-        if not hasattr(self, attr_name):
-            setattr(self, attr_name, fn(self))
-        return getattr(self, attr_name)
+        task = getattr(self, attr_name, None)
+        if task is None or task.cancelled() or (
+                task.done() and task.exception() is not None):
+            task = asyncio.ensure_future(fn(self))
+            setattr(self, attr_name, task)
+        return task
 
+    memoized.memo_attr = attr_name
     return property(memoized)
+
+
+def invalidate(obj: Any, *names: str) -> None:
+    """Drop memoized values of `obj` so they are computed again.
+    Parameters
+    ----------
+    obj: Any
+        an instance with memoized properties
+    names: str
+        the properties to drop, every memoized property by default
+    """
+    if not names:
+        names = tuple(
+            name for klass in type(obj).__mro__
+            for name, attr in vars(klass).items()
+            if hasattr(getattr(attr, "fget", None), "memo_attr"))
+    for name in names:
+        _memo_forget(obj, "_{}".format(name))
+
+
+def set_memoize_limit(max_bytes: Optional[int]) -> None:
+    """Bound the total size of memoized values across the process.
+    Least recently used values are dropped first once the bound is
+    exceeded; a cached read finding the bookkeeping busy in another
+    thread skips marking itself used rather than wait. None (the
+    default) lifts the bound.
+    """
+    global _memo_limit, _memo_bytes
+    with _memo_lock:
+        _memo_limit = max_bytes
+        if max_bytes is None:
+            _memo_lru.clear()
+            _memo_dead.clear()
+            _memo_bytes = 0
+    _memo_evict()
+
+
+def _memo_forget(obj: Any, attr_name: str) -> None:
+    """Delete one memoized value and its bookkeeping"""
+    global _memo_bytes
+    for name in (attr_name, "{}_expires".format(attr_name)):
+        if name in vars(obj):
+            delattr(obj, name)
+    with _memo_lock:
+        _memo_reap()
+        entry = _memo_lru.pop((id(obj), attr_name), None)
+        if entry is not None:
+            _memo_bytes -= entry[1]
+
+
+def _memo_touch(obj: Any, attr_name: str) -> None:
+    """Mark a memoized value as the most recently used, unless another
+    thread holds _memo_lock: cached reads never wait on it, so recency
+    is approximate under contention"""
+    if not _memo_lock.acquire(blocking=False):
+        return
+    try:
+        _memo_reap()
+        key = (id(obj), attr_name)
+        if key in _memo_lru:
+            _memo_lru.move_to_end(key)
+    finally:
+        _memo_lock.release()
+
+
+def _memo_track(obj: Any, attr_name: str, value: Any) -> None:
+    """Account a new memoized value then evict down to the limit"""
+    global _memo_bytes
+    key = (id(obj), attr_name)
+    try:
+        ref = weakref.ref(obj, lambda ref: _memo_died(key, ref))
+    except TypeError:
+        return
+    size = _sizeof(value)
+    with _memo_lock:
+        _memo_reap()
+        old = _memo_lru.pop(key, None)
+        if old is not None:
+            _memo_bytes -= old[1]
+        _memo_lru[key] = (ref, size)
+        _memo_bytes += size
+    _memo_evict()
+
+
+def _memo_died(key: Tuple[int, str], ref: weakref.ref) -> None:
+    """Weakref callback: stop accounting the value of a dead instance.
+    The callback may run while this thread holds _memo_lock, so the
+    entry is queued and removed by whoever holds the lock next.
+    """
+    _memo_dead.append((key, ref))
+    if _memo_lock.acquire(blocking=False):
+        try:
+            _memo_reap()
+        finally:
+            _memo_lock.release()
+
+
+def _memo_reap() -> None:
+    """Remove the queued entries of dead instances; hold _memo_lock"""
+    global _memo_bytes
+    while _memo_dead:
+        key, ref = _memo_dead.popleft()
+        entry = _memo_lru.get(key)
+        # the id may already belong to a new instance with its own entry
+        if entry is not None and entry[0] is ref:
+            del _memo_lru[key]
+            _memo_bytes -= entry[1]
+
+
+def _memo_evict() -> None:
+    """Drop least recently used values while over the limit"""
+    global _memo_bytes
+    while True:
+        with _memo_lock:
+            _memo_reap()
+            if _memo_limit is None or _memo_bytes <= _memo_limit \
+                    or not _memo_lru:
+                return
+            (_, attr_name), (ref, size) = _memo_lru.popitem(last=False)
+            _memo_bytes -= size
+        obj = ref()
+        if obj is not None:
+            for name in (attr_name, "{}_expires".format(attr_name)):
+                if name in vars(obj):
+                    delattr(obj, name)
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate deep size of a JSON-like value, in bytes.
+    Lists longer than _SIZEOF_SAMPLE are measured on that many evenly
+    spaced items scaled up to their length, so the cost stays flat
+    however many repos a payload holds.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        count = len(value)
+        if count > _SIZEOF_SAMPLE:
+            step = count / _SIZEOF_SAMPLE
+            value = [value[int(i * step)] for i in range(_SIZEOF_SAMPLE)]
+        if value:
+            size += sum(_sizeof(item) for item in value) * count \
+                // len(value)
+    return size